@@ -0,0 +1,304 @@
+"""
+Benchmark suite of the S-N evaluation, export and plotting hot paths
+
+Runs offline, times every case over input sizes from 1 to max_size (powers of ten) and writes the
+results to a JSON baseline. A later run compared against a baseline flags every case that got
+slower by more than the threshold.
+
+    python sn_benchmark.py --max-size 1e8 --output baseline.json
+    python sn_benchmark.py --compare baseline.json --threshold 0.2
+"""
+
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+import sn_curve_iso_6336
+from sn_curve_iso_6336 import SnCurveIso6336, SnCurveTable, export_data, write_dat_files
+
+
+# cold-start import of the module after NumPy, run in a fresh interpreter
+_IMPORT_BENCHMARK = """
+import sys, time
+import numpy
+start = time.perf_counter()
+import sn_curve_iso_6336
+sys.stderr.write(repr(time.perf_counter() - start))
+"""
+
+
+def _materials(size: int) -> list:
+    '''returns size materials, the catalogue repeated with fresh objects'''
+    catalogue = sn_curve_iso_6336.materials_COB
+    materials = []
+    for i in range(size):
+        material = catalogue[i % len(catalogue)]
+        materials.append(SnCurveIso6336(f'{i:06d}_{material.name}', 
+                                        *(getattr(material, name) for name in sn_curve_iso_6336._PARAMETERS)))
+    return materials
+
+
+def _load_cycles(size: int) -> np.ndarray:
+    '''returns size load cycles spread over all segments of the S-N curves'''
+    return np.geomspace(1, 1e11, size)
+
+
+def _setup_sig_perm(size: int, directory: str):
+    material, load_cycles = sn_curve_iso_6336.materials_COB[3], _load_cycles(size).tolist()
+    return lambda: [material.calc_sig_perm(N) for N in load_cycles]
+
+
+def _setup_sig_perm_array(size: int, directory: str):
+    material, load_cycles = sn_curve_iso_6336.materials_COB[3], _load_cycles(size)
+    return lambda: material.calc_sig_perm_array(load_cycles)
+
+
+def _setup_lookup(size: int, directory: str):
+    from sn_lookup import SnLookupTable
+
+    table, load_cycles = SnLookupTable.from_curve(sn_curve_iso_6336.materials_COB[3]), _load_cycles(size).tolist()
+    return lambda: [table(N) for N in load_cycles]
+
+
+def _setup_sig_perm_table(size: int, directory: str):
+    table = SnCurveTable.from_curves(sn_curve_iso_6336.materials_COB)
+    load_cycles = _load_cycles(max(size // len(table), 1))
+    # the segments are built once per table, not per call
+    table.segments
+    return lambda: table.calc_sig_perm(load_cycles)
+
+
+def _setup_slope(size: int, directory: str):
+    materials = _materials(size)
+
+    def run():
+        # drop the cached coefficients, so every call computes the slope
+        sn_curve_iso_6336._shared_coefficients.cache_clear()
+        for material in materials:
+            material._coefficients = None
+            material.slope
+    return run
+
+
+def _setup_slope_table(size: int, directory: str):
+    table = SnCurveTable.from_curves(_materials(size))
+
+    def run():
+        table._segments = None
+        table.slope
+    return run
+
+
+def _setup_write_dat_files(size: int, directory: str):
+    materials = _materials(size)
+    return lambda: write_dat_files(materials, directory)
+
+
+def _setup_export_data(size: int, directory: str):
+    import openpyxl  # noqa: F401, skips the case without an Excel writer
+
+    materials = _materials(size)
+
+    def run():
+        # export_data writes to the working directory
+        cwd = os.getcwd()
+        os.chdir(directory)
+        try:
+            export_data(materials)
+        finally:
+            os.chdir(cwd)
+    return run
+
+
+def _setup_plot(size: int, directory: str):
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    from sn_report import _overview_figure
+
+    materials = _materials(size)
+
+    def run():
+        for side in ('foot', 'flank'):
+            FigureCanvasAgg(_overview_figure(materials, side)).draw()
+    return run
+
+
+def _setup_max_load_scale(size: int, directory: str):
+    from sn_design import max_load_scale
+
+    # size pairs of gear and material, spectra of 20 bins over all segments
+    materials = sn_curve_iso_6336.materials_COB
+    rng = np.random.default_rng(0)
+    shape = (max(size // len(materials), 1), 20)
+    stress_F, stress_H = rng.uniform(200, 1500, shape), rng.uniform(500, 2000, shape)
+    cycles = 10**rng.uniform(2, 9, shape)
+    return lambda: max_load_scale(materials, stress_F, stress_H, cycles)
+
+
+def _setup_stage_disabled(size: int, directory: str):
+    from sn_instrument import stage
+
+    # cost of a stage hook on the hot path without open SnStats context
+    def run():
+        for _ in range(size):
+            with stage('benchmark'):
+                pass
+    return run
+
+
+def _instrumented(setup):
+    '''returns setup running its function inside an open SnStats context'''
+    def instrumented(size: int, directory: str):
+        from sn_instrument import SnStats
+
+        function = setup(size, directory)
+
+        def run():
+            with SnStats():
+                function()
+        return run
+    return instrumented
+
+
+# name: (setup, largest size), setup(size, directory) returns the function to time, files are
+# written to directory
+BENCHMARKS = {
+    'calc_sig_perm': (_setup_sig_perm, 10**5),
+    'calc_sig_perm_array': (_setup_sig_perm_array, 10**8),
+    'lookup_table': (_setup_lookup, 10**5),
+    'table_calc_sig_perm': (_setup_sig_perm_table, 10**8),
+    'slope': (_setup_slope, 10**4),
+    'table_slope': (_setup_slope_table, 10**7),
+    'write_dat_files': (_setup_write_dat_files, 10**3),
+    'export_data': (_setup_export_data, 10**4),
+    'plot_overview': (_setup_plot, 10**3),
+    'max_load_scale': (_setup_max_load_scale, 10**6),
+    'stage_disabled': (_setup_stage_disabled, 10**6),
+    'calc_sig_perm_instrumented': (_instrumented(_setup_sig_perm), 10**5),
+    'write_dat_files_instrumented': (_instrumented(_setup_write_dat_files), 10**3),
+}
+
+
+def _time(function, repeat: int) -> float:
+    '''returns the best time of repeat calls of function in seconds'''
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def time_import(repeat: int = 3) -> float:
+    '''returns the best cold-start import time of the module in seconds'''
+    directory = os.path.dirname(os.path.abspath(__file__))
+    return min(float(subprocess.run([sys.executable, '-c', _IMPORT_BENCHMARK], capture_output=True,
+                                    text=True, check=True, cwd=directory).stderr)
+               for _ in range(repeat))
+
+
+def run(max_size: int = 10**6, repeat: int = 3, cases: list = None) -> dict:
+    """
+    Runs the benchmark cases
+
+    Args:
+        max_size (int, optional): largest input size, every case runs the powers of ten up to
+                                  its own limit and max_size. Defaults to 10**6.
+        repeat (int, optional): number of runs, the best time is kept. Defaults to 3.
+        cases (list, optional): names of the cases in BENCHMARKS. Defaults to None, all cases.
+
+    Returns:
+        dict: 'meta' with the environment, 'import' with the import time and 'results' with the
+              time in seconds per case and size, skipped cases hold the reason instead
+    """
+
+    results = {}
+    for name in cases or BENCHMARKS:
+        setup, limit = BENCHMARKS[name]
+        results[name] = {}
+        size = 1
+        while size <= min(max_size, limit):
+            with tempfile.TemporaryDirectory(prefix='sn_benchmark_') as directory:
+                try:
+                    function = setup(size, directory)
+                except ImportError as e:
+                    results[name] = f'skipped: {e}'
+                    break
+                results[name][str(size)] = _time(function, repeat)
+            # inputs of the largest sizes do not fit into memory twice
+            del function
+            size *= 10
+
+    meta = {'python': platform.python_version(), 'numpy': np.__version__,
+            'machine': platform.machine(), 'processor': platform.processor(),
+            'date': time.strftime('%Y-%m-%d %H:%M:%S')}
+    return {'meta': meta, 'import': time_import(repeat), 'results': results}
+
+
+def compare(baseline: dict, current: dict, threshold: float = 0.2, min_time: float = 1e-4) -> list:
+    """
+    Compares two benchmark runs
+
+    Args:
+        baseline (dict): result of run, e.g. loaded from a baseline file
+        current (dict): result of run
+        threshold (float, optional): allowed relative slow-down. Defaults to 0.2.
+        min_time (float, optional): times below are too noisy and compared against min_time
+                                    instead. Defaults to 1e-4.
+
+    Returns:
+        list: (case, size, baseline time, current time) of every regression
+    """
+
+    regressions = []
+    timings = [('import', '', baseline.get('import'), current.get('import'))]
+    for name, sizes in current['results'].items():
+        old = baseline['results'].get(name)
+        if isinstance(sizes, dict) and isinstance(old, dict):
+            timings += [(name, size, old.get(size), t) for size, t in sizes.items()]
+    for name, size, old, new in timings:
+        if old is not None and new is not None and new > (1 + threshold) * max(old, min_time):
+            regressions.append((name, size, old, new))
+    return regressions
+
+
+def main(argv: list = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--max-size', type=float, default=1e6, help='largest input size')
+    parser.add_argument('--repeat', type=int, default=3, help='runs per case, best time is kept')
+    parser.add_argument('--cases', nargs='+', choices=list(BENCHMARKS), help='cases to run')
+    parser.add_argument('--output', default='benchmark.json', help='JSON file of the results')
+    parser.add_argument('--compare', metavar='BASELINE', help='JSON baseline to compare against')
+    parser.add_argument('--threshold', type=float, default=0.2, help='allowed relative slow-down')
+    args = parser.parse_args(argv)
+
+    current = run(int(args.max_size), args.repeat, args.cases)
+    with open(args.output, 'w') as f:
+        json.dump(current, f, indent=2)
+
+    print(f"{'import':24s} {'':>10s} {current['import']:12.6f} s")
+    for name, sizes in current['results'].items():
+        if not isinstance(sizes, dict):
+            print(f'{name:24s} {sizes}')
+            continue
+        for size, t in sizes.items():
+            print(f'{name:24s} {size:>10s} {t:12.6f} s')
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        regressions = compare(baseline, current, args.threshold)
+        for name, size, old, new in regressions:
+            print(f'REGRESSION {name} {size}: {old:.6f} s -> {new:.6f} s ({new / max(old, 1e-12) - 1:+.0%})')
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,196 @@
+"""
+Incremental build of the generated artefacts of a catalogue
+
+Every artefact has a hash of its inputs: the generator version, the names and keys of its curves
+(see SnCurveIso6336.key) and the cycle grid. The kinds and hashes of the last build are kept in a
+manifest in the output directory, a build only regenerates artefacts whose hash changed or whose
+file is missing.
+
+Artefacts:
+    dat         WL_<name>.dat per material, see SnCurveIso6336.write_dat_file
+    sheet       SN_<name>.pdf per material, see sn_report
+    overview    overview.pdf with the curves of all materials
+    parameters  parameter table of all materials, see sn_export.export_parameters
+"""
+
+import hashlib
+import json
+import os
+from typing import NamedTuple
+
+import numpy as np
+
+from sn_curve_iso_6336 import _dat_cycles, write_dat_files
+
+
+# version of every generator, increase to rebuild all its artefacts after a change of the output
+GENERATOR_VERSIONS = {'dat': 1, 'sheet': 1, 'overview': 1, 'parameters': 1}
+
+MANIFEST = '.sn_build.json'
+
+
+class SnBuild(NamedTuple):
+    '''paths of the artefacts of a build'''
+
+    built: list
+    skipped: list
+    removed: list
+
+
+def _digest(*parts) -> str:
+    '''returns the hash of JSON serializable parts'''
+    return hashlib.sha256(json.dumps(parts).encode()).hexdigest()
+
+
+def _curve(material) -> list:
+    '''returns the inputs of the artefacts of material'''
+    return [material.name, list(material.key)]
+
+
+def _artefacts(materials: list, kinds: tuple, parameters: str) -> list:
+    '''returns kind, file name, hash and materials of every artefact'''
+    artefacts = []
+    if 'dat' in kinds:
+        grid = _dat_cycles()
+        artefacts += [('dat', 'WL_' + material.name + '.dat',
+                       _digest('dat', GENERATOR_VERSIONS['dat'], _curve(material), grid), [material])
+                      for material in materials]
+    if 'sheet' in kinds:
+        artefacts += [('sheet', 'SN_' + material.name + '.pdf',
+                       _digest('sheet', GENERATOR_VERSIONS['sheet'], _curve(material)), [material])
+                      for material in materials]
+    curves = [_curve(material) for material in materials]
+    if 'overview' in kinds:
+        artefacts.append(('overview', 'overview.pdf',
+                          _digest('overview', GENERATOR_VERSIONS['overview'], curves), list(materials)))
+    if 'parameters' in kinds:
+        artefacts.append(('parameters', parameters,
+                          _digest('parameters', GENERATOR_VERSIONS['parameters'], parameters, curves),
+                          list(materials)))
+    return artefacts
+
+
+def _build_artefacts(kind: str, materials: list, directory: str, name: str = None) -> list:
+    '''builds artefacts of one kind, one per material for dat and sheet, returns their paths'''
+    if kind == 'dat':
+        return write_dat_files(materials, directory)
+    if kind == 'sheet':
+        from sn_report import _render_pages
+
+        return [_render_pages([material], os.path.join(directory, 'SN_' + material.name + '.pdf'))
+                for material in materials]
+    if kind == 'overview':
+        from sn_report import _render_pages
+
+        return [_render_pages([], os.path.join(directory, name), materials)]
+    from sn_export import export_parameters
+
+    return [export_parameters(materials, os.path.join(directory, name))]
+
+
+def _read_manifest(path: str) -> dict:
+    '''returns file name: [kind, hash] of the last build, empty if there is none'''
+    try:
+        with open(path) as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    # entries without kind of earlier manifests are rebuilt and never pruned
+    return {name: entry for name, entry in manifest.items() if isinstance(entry, list)}
+
+
+def _write_manifest(path: str, manifest: dict):
+    '''writes the manifest atomically'''
+    with open(path + '.tmp', 'w') as f:
+        json.dump(manifest, f, indent=1, sort_keys=True)
+    os.replace(path + '.tmp', path)
+
+
+def build(materials: list, directory: str = '.', kinds: tuple = ('dat', 'sheet', 'overview', 'parameters'),
+          parameters: str = 'parameters.csv', processes: int = None, force: bool = False,
+          prune: bool = False) -> SnBuild:
+    """
+    Builds the artefacts of a list of materials whose inputs changed since the last build
+
+    Args:
+        materials (list): list of SnCurveIso6336 objects
+        directory (str, optional): output directory, created if missing. Defaults to the working
+                                   directory.
+        kinds (tuple, optional): kinds of artefacts, see module documentation. Defaults to all.
+        parameters (str, optional): file name of the parameter table, the extension selects the
+                                    format, e.g. 'parameters.xlsx'. Defaults to 'parameters.csv'.
+        processes (int, optional): number of worker processes. Defaults to None, no worker
+                                   processes.
+        force (bool, optional): rebuild all artefacts. Defaults to False.
+        prune (bool, optional): delete artefacts of the kinds in kinds that are in the manifest 
+                                but no longer built, e.g. of removed materials. Artefacts of 
+                                other kinds are kept. Defaults to False.
+
+    Returns:
+        SnBuild: paths of the built, skipped and removed artefacts
+    """
+
+    os.makedirs(directory, exist_ok=True)
+    manifest_path = os.path.join(directory, MANIFEST)
+    old = _read_manifest(manifest_path)
+    artefacts = _artefacts(materials, kinds, parameters)
+
+    manifest, outdated, skipped = {}, [], []
+    for kind, name, digest, curves in artefacts:
+        path = os.path.join(directory, name)
+        if not force and old.get(name) == [kind, digest] and os.path.exists(path):
+            manifest[name] = [kind, digest]
+            skipped.append(path)
+        else:
+            outdated.append((kind, name, digest, curves))
+
+    # artefacts per material are built in blocks, one task per kind and block
+    tasks = []
+    blocks = max(processes or 1, 1)
+    for kind in ('dat', 'sheet'):
+        todo = [artefact for artefact in outdated if artefact[0] == kind]
+        tasks += [(kind, [todo[i] for i in block]) for block in np.array_split(np.arange(len(todo)), blocks)
+                  if len(block)]
+    tasks += [(artefact[0], [artefact]) for artefact in outdated if artefact[0] in ('overview', 'parameters')]
+
+    built = []
+    try:
+        if not processes or processes <= 1 or len(tasks) <= 1:
+            for task in tasks:
+                _record(task, _run_task(*task, directory), manifest, built)
+        else:
+            from concurrent.futures import ProcessPoolExecutor
+
+            with ProcessPoolExecutor(processes) as executor:
+                futures = [(task, executor.submit(_run_task, *task, directory)) for task in tasks]
+                for task, future in futures:
+                    _record(task, future.result(), manifest, built)
+    finally:
+        # the manifest keeps the artefacts built so far, even if a later one fails
+        removed = []
+        for name in sorted(old.keys() - {artefact[1] for artefact in artefacts}):
+            if prune and old[name][0] in kinds:
+                path = os.path.join(directory, name)
+                if os.path.exists(path):
+                    os.remove(path)
+                removed.append(path)
+            else:
+                manifest[name] = old[name]
+        _write_manifest(manifest_path, manifest)
+
+    return SnBuild(built, skipped, removed)
+
+
+def _run_task(kind: str, artefacts: list, directory: str) -> list:
+    '''builds the artefacts of one task, returns their paths'''
+    if kind in ('dat', 'sheet'):
+        return _build_artefacts(kind, [artefact[3][0] for artefact in artefacts], directory)
+    _, name, _, materials = artefacts[0]
+    return _build_artefacts(kind, materials, directory, name)
+
+
+def _record(task: tuple, paths: list, manifest: dict, built: list):
+    '''records the kinds and hashes of the built artefacts of a task in the manifest'''
+    for (kind, name, digest, _), path in zip(task[1], paths):
+        manifest[name] = [kind, digest]
+        built.append(path)
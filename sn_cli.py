@@ -0,0 +1,210 @@
+"""
+Batch evaluation of S-N curves from newline-delimited JSON requests
+
+Every input line is one request, every output line the result of the request in the same
+order. Requests are read in batches, the requests of a batch are grouped per curve and
+operation and evaluated with one vectorized call per group. With --processes the batches are
+evaluated by a pool of worker processes that stays alive for the whole input.
+
+Requests, material is a name of materials_COB or materials_ISO or a dict with the arguments of
+SnCurveIso6336:
+
+    {"id": 1, "op": "sig_perm", "material": "AT-01_18CrNiMo7-6(COB)_LN_190-3", "cycles": [1e5, 1e7]}
+    {"id": 2, "op": "N_perm", "material": {...}, "stress": [1200, 1600]}
+    {"id": 3, "op": "damage", "material": "...", "stress_F": [...], "stress_H": [...], "cycles": [...]}
+    {"id": 4, "op": "damage", "material": "...", "torque": [...], "cycles": [...], "torque_ref": 1000,
+     "sig_F_ref": 1200, "sig_H_ref": 1600}
+
+Results hold the id and sig_perm_F, sig_perm_H or N_perm_F, N_perm_H (Infinity for infinite life)
+or per_bin_F, per_bin_H, total_F, total_H. Invalid requests give {"id": ..., "error": "..."}.
+
+    python sn_cli.py requests.jsonl -o results.jsonl --processes 4
+"""
+
+import argparse
+import json
+import sys
+from collections import deque
+
+import numpy as np
+
+import sn_curve_iso_6336
+from sn_curve_iso_6336 import SnCurveIso6336
+from sn_instrument import stage, timed
+
+
+# result fields of every operation
+_FIELDS = {'sig_perm': ('sig_perm_F', 'sig_perm_H'), 'N_perm': ('N_perm_F', 'N_perm_H'),
+           'damage': ('per_bin_F', 'per_bin_H', 'total_F', 'total_H')}
+
+_catalogue = None
+
+
+def _material(material) -> SnCurveIso6336:
+    '''returns the curve of the material of a request, a catalogue name or a dict of arguments'''
+    global _catalogue
+
+    if isinstance(material, dict):
+        return SnCurveIso6336(**{'name': '', **material})
+    if _catalogue is None:
+        # built once per process
+        _catalogue = {curve.name: curve for curve in sn_curve_iso_6336.materials_COB + sn_curve_iso_6336.materials_ISO}
+    if material not in _catalogue:
+        raise ValueError(f'unknown material {material}')
+    return _catalogue[material]
+
+
+def _vector(request: dict, name: str) -> np.ndarray:
+    '''returns the values of name of a request as 1-d array'''
+    if name not in request:
+        raise ValueError(f'missing {name}')
+    return np.asarray(request[name], dtype=float).reshape(-1)
+
+
+def _arrays(op: str, request: dict) -> tuple:
+    '''returns the input arrays of a request'''
+    if op == 'sig_perm':
+        return (_vector(request, 'cycles'),)
+    if op == 'N_perm':
+        return (_vector(request, 'stress'),)
+    if op == 'damage':
+        cycles = _vector(request, 'cycles')
+        if 'torque' in request:
+            load_ratio = _vector(request, 'torque') / float(request['torque_ref'])
+            stress_F, stress_H = float(request['sig_F_ref']) * load_ratio, float(request['sig_H_ref']) * np.sqrt(load_ratio)
+        else:
+            stress_F, stress_H = _vector(request, 'stress_F'), _vector(request, 'stress_H')
+        arrays = tuple(np.broadcast_arrays(stress_F, stress_H, cycles))
+        if len(arrays[0]) == 0:
+            raise ValueError('empty spectrum')
+        return arrays
+    raise ValueError(f'unknown op {op}')
+
+
+def _evaluate(op: str, curve: SnCurveIso6336, arrays: list) -> list:
+    '''evaluates the concatenated inputs of a group, returns the result arrays'''
+    if op == 'sig_perm':
+        return list(curve.calc_sig_perm_array(arrays[0]))
+    if op == 'N_perm':
+        return list(curve.calc_N_perm(arrays[0]))
+    damage = curve.calc_damage(*arrays)
+    return [damage.per_bin_F, damage.per_bin_H]
+
+
+@timed('batch')
+def evaluate_batch(lines: list) -> str:
+    """
+    Evaluates a batch of JSON requests, one vectorized call per curve and operation
+
+    Args:
+        lines (list): JSON requests, see module documentation
+
+    Returns:
+        str: JSON results, one line per request in order of lines
+    """
+
+    results = [None] * len(lines)
+    groups = {}
+    with stage('batch.parse'):
+        for i, line in enumerate(lines):
+            request = {}
+            try:
+                request = json.loads(line)
+                op = request.get('op', 'sig_perm')
+                if 'material' not in request:
+                    raise ValueError('missing material')
+                curve = _material(request['material'])
+                arrays = _arrays(op, request)
+                groups.setdefault((op, curve.key), (curve, []))[1].append((i, arrays))
+            except (ValueError, TypeError, KeyError, AttributeError) as e:
+                results[i] = {'id': request.get('id') if isinstance(request, dict) else None,
+                              'error': f'{type(e).__name__}: {e}'}
+            else:
+                results[i] = {'id': request.get('id')}
+
+    with stage('batch.evaluate'):
+        for (op, _), (curve, members) in groups.items():
+            sizes = [len(arrays[0]) for _, arrays in members]
+            starts = np.cumsum([0] + sizes[:-1])
+            arrays = [np.concatenate(column) for column in zip(*(arrays for _, arrays in members))]
+            outputs = _evaluate(op, curve, arrays)
+            if op == 'damage':
+                outputs += [np.add.reduceat(per_bin, starts) for per_bin in outputs]
+            for k, (i, _) in enumerate(members):
+                for field, output in zip(_FIELDS[op], outputs):
+                    if field.startswith('total'):
+                        results[i][field] = float(output[k])
+                    else:
+                        results[i][field] = output[starts[k]:starts[k] + sizes[k]].tolist()
+
+    return ''.join(json.dumps(result) + '\n' for result in results)
+
+
+def _batches(lines, batch_size: int):
+    '''yields lists of up to batch_size non-empty lines'''
+    batch = []
+    for line in lines:
+        if line.strip():
+            batch.append(line)
+            if len(batch) >= batch_size:
+                yield batch
+                batch = []
+    if batch:
+        yield batch
+
+
+def run(input, output, batch_size: int = 1024, processes: int = None):
+    """
+    Evaluates all requests of input and writes the results to output, batch by batch
+
+    Args:
+        input: iterable of JSON request lines, e.g. a file or sys.stdin
+        output: writable text stream
+        batch_size (int, optional): number of requests per batch. Defaults to 1024.
+        processes (int, optional): number of worker processes. Defaults to None, no worker
+                                   processes.
+    """
+
+    if not processes or processes <= 1:
+        for batch in _batches(input, batch_size):
+            output.write(evaluate_batch(batch))
+            output.flush()
+        return
+
+    from concurrent.futures import ProcessPoolExecutor
+
+    # a few batches per worker in flight, results are written in order as they complete
+    pending = deque()
+    with ProcessPoolExecutor(processes) as executor:
+        for batch in _batches(input, batch_size):
+            pending.append(executor.submit(evaluate_batch, batch))
+            if len(pending) >= 2 * processes:
+                output.write(pending.popleft().result())
+                output.flush()
+        while pending:
+            output.write(pending.popleft().result())
+            output.flush()
+
+
+def main(argv: list = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('input', nargs='?', default='-', help='JSONL requests, - for stdin')
+    parser.add_argument('-o', '--output', default='-', help='JSONL results, - for stdout')
+    parser.add_argument('--batch-size', type=int, default=1024, help='requests per batch')
+    parser.add_argument('--processes', type=int, default=None, help='number of worker processes')
+    args = parser.parse_args(argv)
+
+    input = sys.stdin if args.input == '-' else open(args.input)
+    output = sys.stdout if args.output == '-' else open(args.output, 'w')
+    try:
+        run(input, output, args.batch_size, args.processes)
+    finally:
+        if input is not sys.stdin:
+            input.close()
+        if output is not sys.stdout:
+            output.close()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,10 +1,334 @@
 import numpy as np
-import matplotlib.pyplot as plt
-from matplotlib.ticker import (ScalarFormatter, MultipleLocator)
+import bisect
+import glob
 import math
-import pandas as pd
+import os
+import re
 import time
-from typing import Tuple
+from functools import lru_cache
+from typing import NamedTuple, Tuple
+
+from sn_instrument import stage, timed
+
+
+# numeric input attributes of SnCurveIso6336 in order of the constructor
+_PARAMETERS = ('N_F_stat', 'N_F_d', 'sig_FP_stat', 'sig_FE', 'N_H_stat', 'N_H_d', 'sig_HP_stat', 
+               'sig_H_lim', 'lim_pit_perm', 'red_life_fac')
+
+
+def _frozen_array(values) -> np.ndarray:
+    '''returns a read-only float array of values'''
+    array = np.array(values, dtype=float)
+    array.flags.writeable = False
+    return array
+
+
+class SnSegments(NamedTuple):
+    '''
+    Precomputed piecewise power law of one side (foot or flank) of a S-N curve
+
+    Segment k is valid for thresholds[k-1] < N <= thresholds[k], the permissible stress is
+    sig_ref[k] * (N_ref[k] / N)**exponent[k]. Inverse segment j is valid for 
+    knees[j-1] < stress <= knees[j], the permissible number of load cycles is
+    N_ref_inv[j] * (sig_ref_inv[j] / stress)**p_inv[j]. All arrays are read-only.
+    '''
+
+    thresholds: np.ndarray
+    N_ref: np.ndarray
+    sig_ref: np.ndarray
+    exponent: np.ndarray
+    knees: np.ndarray
+    N_ref_inv: np.ndarray
+    sig_ref_inv: np.ndarray
+    p_inv: np.ndarray
+
+    def sig_perm(self, load_cycles):
+        '''returns permissible stress for load cycles (scalar or array of any shape)'''
+        if isinstance(load_cycles, (int, float)):
+            value = _scalar_power_law(load_cycles, self.thresholds, self.sig_ref, self.N_ref, self.exponent)
+            if value is not None:
+                return value
+        N = np.asarray(load_cycles, dtype=float)
+        k = np.searchsorted(self.thresholds, N)
+        return _power_law(N, self.sig_ref[k], self.N_ref[k], self.exponent[k])[()]
+
+    def N_perm(self, stress):
+        '''returns permissible number of load cycles for stress (scalar or array of any shape)'''
+        if isinstance(stress, (int, float)):
+            value = _scalar_power_law(stress, self.knees, self.N_ref_inv, self.sig_ref_inv, self.p_inv)
+            if value is not None:
+                return value
+        sig = np.asarray(stress, dtype=float)
+        j = np.searchsorted(self.knees, sig)
+        return _power_law(sig, self.N_ref_inv[j], self.sig_ref_inv[j], self.p_inv[j])[()]
+
+
+def _scalar_power_law(x: float, bounds: np.ndarray, y_ref: np.ndarray, x_ref: np.ndarray, 
+                      exponent: np.ndarray) -> float:
+    '''
+    returns _power_law of the segment of a Python number x without the overhead of 0-d arrays, 
+    None for x <= 0 and inf, which follow the numpy rules of the array path
+    '''
+    if x != x:
+        return math.nan
+    if not 0 < x < math.inf:
+        return None
+    # bisect_left is searchsorted with side='left'
+    k = bisect.bisect_left(bounds.tolist(), x)
+    p = exponent.item(k)
+    if p == 0:
+        return y_ref.item(k)
+    # the power of the numpy ufunc, ** of libm may differ in the last bit from the array path
+    return float(y_ref.item(k) * np.power(x_ref.item(k) / x, p))
+
+
+class SnCoefficients(NamedTuple):
+    '''Immutable precomputed form of a S-N curve, built once per set of input attributes'''
+
+    slope: Tuple[float, ...]
+    foot: SnSegments
+    flank: SnSegments
+
+
+class SnDamage(NamedTuple):
+    '''Palmgren-Miner damage of load spectra for foot and flank'''
+
+    per_bin_F: np.ndarray
+    per_bin_H: np.ndarray
+    total_F: np.ndarray
+    total_H: np.ndarray
+
+
+class SnScatter(NamedTuple):
+    '''
+    Scatter of a parameter for the Monte Carlo evaluation, see
+    SnCurveIso6336.calc_failure_probability
+
+    The nominal value of the parameter is the quantile of the distribution, e.g. the endurance
+    limits of ISO 6336 are values for 1 % failure probability. scatter is the standard deviation
+    of the logarithm for 'lognormal' and the shape modulus for 'weibull'.
+    '''
+
+    distribution: str
+    scatter: float
+    quantile: float = 0.01
+
+    def sample(self, nominal: float, size: int, rng: np.random.Generator) -> np.ndarray:
+        '''returns size samples of the parameter with nominal value nominal'''
+        if self.distribution == 'lognormal':
+            from statistics import NormalDist
+
+            z = NormalDist().inv_cdf(self.quantile)
+            return nominal * np.exp(self.scatter * (rng.standard_normal(size) - z))
+        if self.distribution == 'weibull':
+            return nominal * rng.weibull(self.scatter, size) / (-math.log1p(-self.quantile))**(1 / self.scatter)
+        raise ValueError(f"unknown distribution {self.distribution}, use 'lognormal' or 'weibull'")
+
+
+class SnReliability(NamedTuple):
+    '''
+    Failure probability of load spectra for foot, flank and the gear (foot or flank) from a
+    Monte Carlo evaluation, with the confidence interval (lower, upper) of every probability
+    '''
+
+    samples: int
+    failures_F: np.ndarray
+    failures_H: np.ndarray
+    failures: np.ndarray
+    probability_F: np.ndarray
+    probability_H: np.ndarray
+    probability: np.ndarray
+    interval_F: Tuple[np.ndarray, np.ndarray]
+    interval_H: Tuple[np.ndarray, np.ndarray]
+    interval: Tuple[np.ndarray, np.ndarray]
+
+
+def _wilson_interval(failures: np.ndarray, samples: int, confidence: float) -> Tuple[np.ndarray, np.ndarray]:
+    '''returns the Wilson score interval of the failure probability failures / samples'''
+    from statistics import NormalDist
+
+    z = NormalDist().inv_cdf(0.5 + confidence / 2)
+    p = failures / samples
+    center = (p + z**2 / (2 * samples)) / (1 + z**2 / samples)
+    half = z / (1 + z**2 / samples) * np.sqrt(p * (1 - p) / samples + z**2 / (4 * samples**2))
+    return np.maximum(center - half, 0.), np.minimum(center + half, 1.)
+
+
+def _miner_damage(cycles: np.ndarray, N_perm: np.ndarray) -> np.ndarray:
+    '''
+    returns cycles / N_perm, bins without cycles do no damage even above the static limit, NaN 
+    cycles or N_perm give NaN
+    '''
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where((cycles > 0) | np.isnan(cycles) | np.isnan(N_perm), cycles / N_perm, 0.)
+
+
+def _power_law(x: np.ndarray, y_ref: np.ndarray, x_ref: np.ndarray, exponent: np.ndarray) -> np.ndarray:
+    '''
+    returns y_ref * (x_ref / x)**exponent, x = 0 on a plateau (exponent 0) gives y_ref, x = NaN 
+    gives NaN on every segment (NaN**0 would be 1 on a plateau)
+    '''
+    with np.errstate(divide='ignore'):
+        return np.where(np.isnan(x), np.nan, y_ref * np.power(x_ref / x, exponent))
+
+
+def _build_segments(N_F_stat, N_F_d, sig_FP_stat, sig_FE, N_H_stat, N_H_d, sig_HP_stat, sig_H_lim, 
+                    lim_pit_perm, red_life_fac) -> tuple:
+    '''
+    calculates slopes and segments of foot and flank for arrays of curve parameters
+
+    All curves get the same number of segments, see SnSegments. Segments that do not apply 
+    to a curve (limited pitting, reduced life factors) are empty or repeat their neighbour.
+
+    Args:
+        all: 1-d arrays of length M with the attributes of SnCurveIso6336
+
+    Returns:
+        tuple: slope (p_F, p_H, p_H_lim_pit, p_F_red_life_fac, p_H_red_life_fac as arrays of 
+               shape (M,)), foot and flank (fields of SnSegments as arrays of shape (M, n))
+    '''
+
+    log = np.log
+    lim_pit = np.asarray(lim_pit_perm, dtype=bool)
+    red = np.asarray(red_life_fac, dtype=bool)
+    inf = np.full(lim_pit.shape, np.inf)
+    zeros = np.zeros(lim_pit.shape)
+    ones = np.ones(lim_pit.shape)
+
+    # slopes of all branches are calculated, not applicable ones are replaced by -1
+    with np.errstate(divide='ignore', invalid='ignore'):
+        sig_H_lim_pit = (sig_H_lim + sig_HP_stat) / 2
+        p_F = (log(N_F_d) - log(N_F_stat)) / (log(sig_FP_stat) - log(sig_FE))
+        # when limited pitting is permitted s-n curve for flank has two different slopes
+        p_H = np.where(lim_pit, 
+                       (log(1e7) - log(N_H_stat)) / (log(sig_HP_stat) - log(sig_H_lim_pit)), 
+                       (log(N_H_d) - log(N_H_stat)) / (log(sig_HP_stat) - log(sig_H_lim)))
+        p_H_lim_pit = np.where(lim_pit, (log(1e9) - log(1e7)) / (log(sig_H_lim_pit) - log(sig_H_lim)), -1.)
+        p_F_red_life_fac = np.where(red, (log(1e10) - log(N_F_d)) / (log(sig_FE) - log(0.85 * sig_FE)), -1.)
+        p_H_red_life_fac = np.where(red, (log(1e10) - log(N_H_d)) / (log(sig_H_lim) - log(0.85 * sig_H_lim)), -1.)
+
+    def columns(*values):
+        return np.stack(np.broadcast_arrays(*values), axis=-1, dtype=float)
+
+    # foot: static limit, finite life, after N_F_d, after 10^10
+    sig_FE_red = np.where(red, sig_FE * 0.85, sig_FE)
+    foot = (columns(N_F_stat, np.nextafter(N_F_d, -np.inf), 1e10),
+            columns(ones, N_F_d, np.where(red, 1e10, 1.), ones),
+            columns(sig_FP_stat, sig_FE, sig_FE_red, sig_FE_red),
+            columns(zeros, 1/p_F, np.where(red, 1/p_F_red_life_fac, 0.), zeros),
+            columns(sig_FE_red, sig_FE, sig_FP_stat),
+            columns(inf, np.where(red, 1e10, np.inf), N_F_d, zeros),
+            columns(ones, np.where(red, sig_FE_red, 1.), sig_FE, ones),
+            columns(zeros, np.where(red, p_F_red_life_fac, 0.), p_F, zeros))
+
+    # flank: static limit, limited pitting, finite life, after N_H_d, after 10^10
+    sig_H_lim_red = np.where(red, sig_H_lim * 0.85, sig_H_lim)
+    sig_H_knee = np.where(lim_pit, sig_H_lim_pit, sig_H_lim)
+    N_H_knee = np.where(lim_pit, 1e7, N_H_d)
+    p_H_knee = np.where(lim_pit, p_H_lim_pit, p_H)
+    flank = (columns(N_H_stat, np.where(lim_pit, 1e7, N_H_stat), np.nextafter(N_H_d, -np.inf), 1e10),
+             columns(ones, N_H_knee, N_H_d, np.where(red, 1e10, 1.), ones),
+             columns(sig_HP_stat, sig_H_knee, sig_H_lim, sig_H_lim_red, sig_H_lim_red),
+             columns(zeros, 1/p_H, 1/p_H_knee, np.where(red, 1/p_H_red_life_fac, 0.), zeros),
+             columns(sig_H_lim_red, sig_H_lim, sig_H_knee, sig_HP_stat),
+             columns(inf, np.where(red, 1e10, np.inf), N_H_d, N_H_knee, zeros),
+             columns(ones, np.where(red, sig_H_lim_red, 1.), sig_H_lim, sig_H_knee, ones),
+             columns(zeros, np.where(red, p_H_red_life_fac, 0.), p_H_knee, p_H, zeros))
+
+    return (p_F, p_H, p_H_lim_pit, p_F_red_life_fac, p_H_red_life_fac), foot, flank
+
+
+def _curve_key(N_F_stat, N_F_d, sig_FP_stat, sig_FE, N_H_stat, N_H_d, sig_HP_stat, sig_H_lim, 
+               lim_pit_perm, red_life_fac) -> tuple:
+    '''returns the canonical key of a S-N curve, see SnCurveIso6336.key'''
+    return (float(N_F_stat), float(N_F_d), float(sig_FP_stat), float(sig_FE), float(N_H_stat), 
+            float(N_H_d), float(sig_HP_stat), float(sig_H_lim), bool(lim_pit_perm), bool(red_life_fac))
+
+
+def _constraints(N_F_stat, N_F_d, sig_FP_stat, sig_FE, N_H_stat, N_H_d, sig_HP_stat, sig_H_lim, 
+                 lim_pit_perm, red_life_fac) -> list:
+    '''
+    returns every constraint of the parameters of a S-N curve and whether it holds, as bool for 
+    scalars or as bool array for arrays of parameters
+    '''
+
+    def finite(x):
+        # NaN fails both comparisons
+        return (x > 0) & (x < math.inf)
+
+    return [('0 < N_F_stat < inf', finite(N_F_stat)), ('0 < N_F_d < inf', finite(N_F_d)), 
+            ('0 < sig_FP_stat < inf', finite(sig_FP_stat)), ('0 < sig_FE < inf', finite(sig_FE)), 
+            ('0 < N_H_stat < inf', finite(N_H_stat)), ('0 < N_H_d < inf', finite(N_H_d)), 
+            ('0 < sig_HP_stat < inf', finite(sig_HP_stat)), ('0 < sig_H_lim < inf', finite(sig_H_lim)), 
+            ('N_F_stat < N_F_d', N_F_stat < N_F_d), ('N_H_stat < N_H_d', N_H_stat < N_H_d), 
+            ('sig_FE < sig_FP_stat', sig_FE < sig_FP_stat), ('sig_H_lim < sig_HP_stat', sig_H_lim < sig_HP_stat), 
+            # the limited pitting branch runs from N_H_stat over 10^7 to N_H_d
+            ('N_H_stat < 1e7 < N_H_d with lim_pit_perm', 
+             (lim_pit_perm == 0) | ((N_H_stat < 1e7) & (N_H_d > 1e7))), 
+            # the reduced life factors apply from N_F_d and N_H_d to 10^10
+            ('N_F_d < 1e10 and N_H_d < 1e10 with red_life_fac', 
+             (red_life_fac == 0) | ((N_F_d < 1e10) & (N_H_d < 1e10)))]
+
+
+def invalid_parameters(N_F_stat, N_F_d, sig_FP_stat, sig_FE, N_H_stat, N_H_d, sig_HP_stat, sig_H_lim, 
+                       lim_pit_perm=False, red_life_fac=False) -> dict:
+    """
+    Checks the parameters of many S-N curves at once
+
+    Args:
+        all: arrays (or scalars, broadcast to all curves) with the attributes of SnCurveIso6336
+
+    Returns:
+        dict: violated constraint: indices of the offending rows, empty if all rows are valid
+    """
+
+    values = np.broadcast_arrays(N_F_stat, N_F_d, sig_FP_stat, sig_FE, N_H_stat, N_H_d, 
+                                 sig_HP_stat, sig_H_lim, lim_pit_perm, red_life_fac)
+    values = [np.asarray(value, dtype=bool if name in ('lim_pit_perm', 'red_life_fac') else float).reshape(-1)
+              for name, value in zip(_PARAMETERS, values)]
+    with np.errstate(invalid='ignore'):
+        checks = _constraints(*values)
+    invalid = {}
+    for constraint, valid in checks:
+        rows = np.flatnonzero(~np.broadcast_to(valid, values[0].shape))
+        if len(rows):
+            invalid[constraint] = rows
+    return invalid
+
+
+def _check_parameters(*values):
+    '''raises ValueError with the offending rows if parameters violate a constraint, see invalid_parameters'''
+    invalid = invalid_parameters(*values)
+    if invalid:
+        raise ValueError('invalid S-N curves: ' + '; '.join(
+            f"{constraint} is violated in {len(rows)} rows {rows[:10].tolist()}{' ...' if len(rows) > 10 else ''}" 
+            for constraint, rows in invalid.items()))
+
+
+def _check_curve(name: str, N_F_stat, N_F_d, sig_FP_stat, sig_FE, N_H_stat, N_H_d, sig_HP_stat, sig_H_lim, 
+                 lim_pit_perm, red_life_fac):
+    '''raises ValueError with the first violated constraint of a S-N curve, see invalid_parameters'''
+    # all constraints of _constraints in one chained comparison, the list only on failure
+    if not (0 < N_F_stat < N_F_d < math.inf and 0 < sig_FE < sig_FP_stat < math.inf and 
+            0 < N_H_stat < N_H_d < math.inf and 0 < sig_H_lim < sig_HP_stat < math.inf and 
+            (not lim_pit_perm or N_H_stat < 1e7 < N_H_d) and 
+            (not red_life_fac or (N_F_d < 1e10 and N_H_d < 1e10))):
+        constraint = next(constraint for constraint, valid in _constraints(
+            N_F_stat, N_F_d, sig_FP_stat, sig_FE, N_H_stat, N_H_d, sig_HP_stat, sig_H_lim, lim_pit_perm, 
+            red_life_fac) if not valid)
+        raise ValueError(f'invalid S-N curve {name}: {constraint} is violated')
+
+
+@lru_cache(maxsize=4096)
+def _shared_coefficients(key: tuple) -> SnCoefficients:
+    '''calculates slopes and segments of foot and flank once per distinct curve, see SnSegments'''
+
+    parameters = [np.asarray([value], dtype=float) for value in key]
+    slope, foot, flank = _build_segments(*parameters)
+    
+    return SnCoefficients(tuple(p[0] for p in slope), 
+                          SnSegments(*(_frozen_array(field[0]) for field in foot)), 
+                          SnSegments(*(_frozen_array(field[0]) for field in flank)))
 
 
 class SnCurveIso6336:
@@ -13,6 +337,12 @@ class SnCurveIso6336:
     ISO 6336
     
     '''
+
+    __slots__ = ('name', 'N_F_stat', 'N_F_d', 'sig_FP_stat', 'sig_FE', 'N_H_stat', 'N_H_d', 
+                 'sig_HP_stat', 'sig_H_lim', 'lim_pit_perm', 'red_life_fac', '_coefficients')
+
+    # attributes the precomputed coefficients depend on
+    _INPUTS = frozenset(_PARAMETERS)
     
     def __init__(self, name: str, N_F_stat: int, N_F_d: int, sig_FP_stat: float, sig_FE: float, 
                 N_H_stat: int, N_H_d: int, sig_HP_stat: float, sig_H_lim: float, 
@@ -36,55 +366,78 @@ class SnCurveIso6336:
                                             0,85 according to ISO 6336 from N_F_d and 
                                             N_H_d to 10^10 load cycles? Defaults to 
                                             False.
+
+        Raises:
+            ValueError: if the parameters violate a constraint, see invalid_parameters. Later 
+                        changes of the attributes are checked as well.
         """
 
-        self.name = name
-        self.N_F_stat = N_F_stat
-        self.N_F_d = N_F_d
-        self.sig_FP_stat = sig_FP_stat
-        self.sig_FE = sig_FE
-        self.N_H_stat = N_H_stat
-        self.N_H_d = N_H_d
-        self.sig_HP_stat = sig_HP_stat
-        self.sig_H_lim = sig_H_lim
-        self.lim_pit_perm = lim_pit_perm
-        self.red_life_fac = red_life_fac
-        self._my_var = 'akgflkaga'
-        self._radius = 10.
+        _check_curve(name, N_F_stat, N_F_d, sig_FP_stat, sig_FE, N_H_stat, N_H_d, sig_HP_stat, sig_H_lim, 
+                     lim_pit_perm, red_life_fac)
+        # the parameters are checked at once, not one by one by __setattr__
+        setattr_ = object.__setattr__
+        setattr_(self, 'name', name)
+        setattr_(self, 'N_F_stat', N_F_stat)
+        setattr_(self, 'N_F_d', N_F_d)
+        setattr_(self, 'sig_FP_stat', sig_FP_stat)
+        setattr_(self, 'sig_FE', sig_FE)
+        setattr_(self, 'N_H_stat', N_H_stat)
+        setattr_(self, 'N_H_d', N_H_d)
+        setattr_(self, 'sig_HP_stat', sig_HP_stat)
+        setattr_(self, 'sig_H_lim', sig_H_lim)
+        setattr_(self, 'lim_pit_perm', lim_pit_perm)
+        setattr_(self, 'red_life_fac', red_life_fac)
+        setattr_(self, '_coefficients', None)
 
         # MS: - Sind diese Attribute wirklich alle public? 
         #       Wenn ja, besser als Property mit validierung, oder zumindest Dockstrings inkl type für jedes Attribut schreiben
         #       Wenn nein, als private self._var_name benennen
-        #     - init-parameter auf Type und Intervall prüfen, bei Fehlschlägen Exception auslösen
-        #       Gilt ebenfalls für alle anderen Public-Methoden
         #     - Welche Methoden müssen Public sein?
         #     - __str__ und __repr__ Methoden implementieren
         
 
-    # region properties
-    
-    @property
-    def my_var(self) -> str: 
-        '''Liefert die variable tralala oder legt sie fest'''
-        return self._my_var
-    @my_var.setter
-    def my_var(self, value):
-        self._my_var = value
-        print("my_var gesetzt!")
+    def __repr__(self):
+        return f'SnCurveIso6336({self.name},{self.N_F_stat},{self.N_F_d})'
+
+    def __setattr__(self, name, value):
+        if name in self._INPUTS:
+            try:
+                values = [self.name] + [value if parameter == name else getattr(self, parameter) 
+                                        for parameter in _PARAMETERS]
+            except AttributeError:
+                # copy and pickle restore the attributes one by one
+                values = None
+            if values is not None:
+                # the changed curve must be valid as well, the attribute is kept on failure
+                _check_curve(*values)
+            # invalidate precomputed coefficients
+            object.__setattr__(self, '_coefficients', None)
+        object.__setattr__(self, name, value)
 
     @property
-    def CircleArea(self) -> float: 
-        '''Liefert die Flaeche des Kreises mit Radius R'''
-        return self._radius**2 * 3.14
-    # endregion
+    def key(self) -> tuple:
+        """
+        Canonical key of the S-N curve, the numeric attributes as floats and the flags as bools. 
+        Materials with the same key have the same S-N curve, whatever their name.
+        """
+        return _curve_key(*(getattr(self, name) for name in _PARAMETERS))
 
-    def __repr__(self):
-        return f'SnCurveIso6336({self.name},{self.N_F_stat},{self.N_F_d})'
+    @property
+    def coefficients(self) -> SnCoefficients:
+        """
+        Precomputed slopes and segments of the S-N curves for foot and flank, built on first 
+        access and rebuilt only after an input attribute has changed. Materials with the same 
+        key share one SnCoefficients object.
+        """
+        
+        if self._coefficients is None:
+            self._coefficients = _shared_coefficients(self.key)
+        return self._coefficients
 
     @property
     def slope(self) -> Tuple[float]:
         """
-        Calculates the exponent (slope) of the S-N curve for the tooth root and the flank
+        Exponent (slope) of the S-N curve for the tooth root and the flank
 
         Returned value p_H for pitting is for stress; to convert for torque, these value must be divided by 2
 
@@ -95,35 +448,8 @@ class SnCurveIso6336:
         # MS: Methoden ohne Parameter und "billigen berechnungen" besser als ReadOnly Property und Name 
         #     ohne Imperativ, also nur slope
 
-        log = np.log
-        N_F_d = self.N_F_d
-        N_F_stat = self.N_F_stat
-        sig_FP_stat = self.sig_FP_stat
-        sig_FE = self.sig_FE
-        N_H_d = self.N_F_d
-        N_H_stat = self.N_F_stat
-        sig_HP_stat = self.sig_FP_stat
-        sig_H_lim = self.sig_FE
-
-        p_F = (log(N_F_d) - log(N_F_stat)) / (log(sig_FP_stat) - log(sig_FE))
-        p_H = (log(N_H_d) - log(N_H_stat)) / (log(sig_HP_stat) - log(sig_H_lim))
+        return self.coefficients.slope
 
-        if self.lim_pit_perm: # when limited pitting is permitted s-n curve for flank has two different slopes
-            p_H = (log(1e7) - log(N_H_stat)) / (log(sig_HP_stat) - log(0.5 * (sig_H_lim + sig_HP_stat)))
-            p_H_lim_pit = (log(1e9) - log(1e7)) / (log(0.5 * (sig_H_lim + sig_HP_stat)) - log(sig_H_lim))
-        else:
-            p_H_lim_pit = -1 
-        
-        if self.red_life_fac:
-            p_F_red_life_fac = (log(1e10) - log(N_F_d)) / (log(sig_FE) - log(0.85 * sig_FE))
-            p_H_red_life_fac = (log(1e10) - log(N_H_d)) / (log(sig_H_lim) - log(0.85 * sig_H_lim))
-        else:
-            p_F_red_life_fac = -1
-            p_H_red_life_fac = -1 
-                   
-        return p_F, p_H, p_H_lim_pit, p_F_red_life_fac, p_H_red_life_fac
-    
-    @staticmethod
     def to_dict(self) -> dict:
         """
         Transforms material entry to a dictionary, used in function "export_data"'''
@@ -135,7 +461,7 @@ class SnCurveIso6336:
                   'p_F', 'p_H', 'p_H_lim_pit', 'p_F_red_life_fac', 'p_H_red_life_fac'
         """
 
-        p_F, p_H, p_H_lim_pit, p_F_red_life_fac, p_H_red_life_fac = self.calc_slope()
+        p_F, p_H, p_H_lim_pit, p_F_red_life_fac, p_H_red_life_fac = self.slope
 
         return {'name': self.name, 'N_F_stat': self.N_F_stat, 'N_F_d': self.N_F_d, 
                 'sig_FP_stat': self.sig_FP_stat, 'sig_FE': self.sig_FE, 
@@ -146,29 +472,34 @@ class SnCurveIso6336:
                 'p_F_red_life_fac': p_F_red_life_fac, 'p_H_red_life_fac':p_H_red_life_fac}
     
     
+    @timed('plot')
     def plot_SN_curve(self, save_file: bool = False):
         '''
         plots the S-N curves for the tooth root and the flank of a S-N curve object    
         not included in permissable stress are the factors according to ISO 6336 like surface factor
         '''
 
+        # matplotlib is imported on first use, the numeric API only needs NumPy
+        import matplotlib.pyplot as plt
+        from matplotlib.ticker import (ScalarFormatter, MultipleLocator)
+
         # speichern als PDF soll optional gehen
-        self.sig_FE_red_life_fac = self.sig_FE if self.red_life_fac == 0 else 0.85 * self.sig_FE
+        sig_FE_red_life_fac = self.sig_FE if self.red_life_fac == 0 else 0.85 * self.sig_FE
         
         N = [1, self.N_F_stat, self.N_F_d, 1e10]
-        stress = [self.sig_FP_stat, self.sig_FP_stat, self.sig_FE, self.sig_FE_red_life_fac]
+        stress = [self.sig_FP_stat, self.sig_FP_stat, self.sig_FE, sig_FE_red_life_fac]
         plt.loglog(N, stress, '-')
         
         N_lim_perm = self.N_H_stat if self.lim_pit_perm == 0 else 1e7
         sig_H_lim_perm = self.sig_HP_stat if self.lim_pit_perm == 0 else 0.5*(self.sig_H_lim+self.sig_HP_stat)
-        self.sig_H_lim_red_life_fac = self.sig_H_lim if self.red_life_fac ==0 else 0.85 * self.sig_H_lim
+        sig_H_lim_red_life_fac = self.sig_H_lim if self.red_life_fac ==0 else 0.85 * self.sig_H_lim
         
         N = [1, self.N_H_stat, N_lim_perm, self.N_H_d, 1e10]
-        stress = [self.sig_HP_stat, self.sig_HP_stat, sig_H_lim_perm, self.sig_H_lim, self.sig_H_lim_red_life_fac]
+        stress = [self.sig_HP_stat, self.sig_HP_stat, sig_H_lim_perm, self.sig_H_lim, sig_H_lim_red_life_fac]
 
         plt.loglog(N, stress, '-')
     
-        all_values = list(set([self.sig_FP_stat, self.sig_FE, self.sig_HP_stat, self.sig_H_lim, self.sig_FE_red_life_fac]))
+        all_values = list(set([self.sig_FP_stat, self.sig_FE, self.sig_HP_stat, self.sig_H_lim, sig_FE_red_life_fac]))
         min_value = math.floor(min(all_values)/100.)*100
         max_value = math.ceil(max(all_values)/100.)*100
         
@@ -214,153 +545,565 @@ class SnCurveIso6336:
             Tuple[float]: perm stress foot, perm stress flank
         """
         
-        p_F, p_H, p_H_lim_pit, p_F_red_life_fac, p_H_red_life_fac = self.calc_slope()
-        
-        # Calculation of perm. stress sig_perm_F
-        if load_cycles <= self.N_F_stat: 
-            sig_perm_F = self.sig_FP_stat
-        elif load_cycles >= self.N_F_d:
-            if self.red_life_fac:
-                if load_cycles > 1e10:
-                    sig_perm_F = self.sig_FE * 0.85
-                else:
-                    sig_perm_F = self.sig_FE * 0.85 * (1e10/load_cycles)**(1/p_F_red_life_fac)
-            else:
-                sig_perm_F = self.sig_FE
-        elif load_cycles > self.N_F_stat and load_cycles < self.N_F_d:
-            sig_perm_F = self.sig_FE * (self.N_F_d/load_cycles)**(1/p_F)
-        
-        # Calculation of perm. stress sig_perm_H
-        if load_cycles <= self.N_H_stat: 
-            sig_perm_H = self.sig_HP_stat
-        elif load_cycles > self.N_H_stat and load_cycles < self.N_H_d:
-            if self.lim_pit_perm:
-                if load_cycles <= 1e7:
-                    sig_perm_H = (self.sig_H_lim + self.sig_HP_stat) / 2 * (1e7/load_cycles)**(1/p_H)
-                else:
-                    sig_perm_H = self.sig_H_lim * (self.N_H_d/load_cycles)**(1/p_H_lim_pit)
-            else:
-                sig_perm_H = self.sig_H_lim * (self.N_H_d/load_cycles)**(1/p_H)
-        elif load_cycles >= self.N_H_d:
-            if self.red_life_fac:
-                if load_cycles > 1e10:
-                    sig_perm_H = self.sig_H_lim * 0.85
-                else:
-                    sig_perm_H = self.sig_H_lim * 0.85 * (1e10/load_cycles)**(1/p_H_red_life_fac)
-            else:
-                sig_perm_H = self.sig_H_lim
-            
-        #print('sig_perm_F: ' + str(sig_perm_F) + ', sig_perm_H: ' + str(sig_perm_H))
-        return sig_perm_F, sig_perm_H
-        
-    
-    def calc_N_perm(self, stress):
-        '''returns permissible number of load cycles for given number of load cycles
-        
+        coefficients = self.coefficients
+        return coefficients.foot.sig_perm(load_cycles), coefficients.flank.sig_perm(load_cycles)
+
+    def calc_sig_perm_array(self, load_cycles: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        returns permissible stress for foot and flank for an array of load cycles
+
+        Vectorized counterpart of calc_sig_perm, the segment of every element is found by a 
+        sorted lookup over the precomputed coefficients. The results are identical to 
+        calc_sig_perm element by element.
+
         Args:
-        stress (float): number of load cycles for which the permissible stress shall be calculated
-        '''
-        raise NotImplementedError("Sorry, time has running out.")
-        # TODO
-        #N_perm_F = self.N_F_d * (self.sig_FE/self.sig_FP_stat)**p
-    
+            load_cycles (np.ndarray): Numbers of stress cycles, any shape
+
+        Returns:
+            Tuple[np.ndarray, np.ndarray]: perm stress foot, perm stress flank, both with the 
+                                           shape of load_cycles
+        """
+
+        N = np.asarray(load_cycles, dtype=float)
+        coefficients = self.coefficients
+        return np.asarray(coefficients.foot.sig_perm(N)), np.asarray(coefficients.flank.sig_perm(N))
+
+    def calc_N_perm(self, stress) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        returns permissible number of load cycles for foot and flank for given stress, inverse 
+        of calc_sig_perm
+
+        The S-N segment of every element is found by a sorted lookup over the knee stresses. 
+        Stresses above the static limit give 0 load cycles, stresses at or below the 
+        endurance limit (0.85 * endurance limit with red_life_fac) give infinite life.
+
+        Args:
+            stress (float or np.ndarray): stress for which the permissible number of load cycles 
+                                          shall be calculated, scalar or array of any shape. The 
+                                          same stress is used for foot and flank.
+
+        Returns:
+            Tuple[np.ndarray, np.ndarray]: perm load cycles foot, perm load cycles flank, both 
+                                           with the shape of stress
+        """
+
+        coefficients = self.coefficients
+        return coefficients.foot.N_perm(stress), coefficients.flank.N_perm(stress)
+
+    def calc_damage(self, stress_F, stress_H, cycles) -> SnDamage:
+        """
+        returns damage of load spectra for foot and flank according to Palmgren-Miner
+
+        The damage of a bin is cycles / calc_N_perm(stress), bins above the static limit give 
+        infinite damage, bins at or below the endurance limit no damage. Bins are along the last 
+        axis, leading axes are independent spectra.
+
+        Args:
+            stress_F (np.ndarray): tooth root stress of every bin
+            stress_H (np.ndarray): flank stress of every bin
+            cycles (np.ndarray): number of load cycles of every bin
+
+        Returns:
+            SnDamage: per_bin_F, per_bin_H with the broadcast shape of the inputs and total_F, 
+                      total_H summed over the last axis
+        """
+
+        coefficients = self.coefficients
+        cycles = np.asarray(cycles, dtype=float)
+        per_bin_F = _miner_damage(cycles, coefficients.foot.N_perm(stress_F))
+        per_bin_H = _miner_damage(cycles, coefficients.flank.N_perm(stress_H))
+        per_bin_F, per_bin_H = np.broadcast_arrays(per_bin_F, per_bin_H)
+
+        return SnDamage(per_bin_F, per_bin_H, per_bin_F.sum(axis=-1), per_bin_H.sum(axis=-1))
+
+    def calc_damage_torque(self, torque, cycles, torque_ref: float, sig_F_ref: float, 
+                           sig_H_ref: float) -> SnDamage:
+        """
+        returns damage of load spectra given in torque for foot and flank, see calc_damage
+
+        The tooth root stress is proportional to the torque, the flank stress to its square root. 
+        In the torque domain the exponents p_H for pitting are therefore halved.
+
+        Args:
+            torque (np.ndarray): torque of every bin
+            cycles (np.ndarray): number of load cycles of every bin
+            torque_ref (float): reference torque
+            sig_F_ref (float): tooth root stress at reference torque
+            sig_H_ref (float): flank stress at reference torque
+
+        Returns:
+            SnDamage: see calc_damage
+        """
+
+        load_ratio = np.asarray(torque, dtype=float) / torque_ref
+        return self.calc_damage(sig_F_ref * load_ratio, sig_H_ref * np.sqrt(load_ratio), cycles)
+
+    def calc_failure_probability(self, stress_F, stress_H, cycles, scatter: dict,
+                                 samples: int = 10**6, damage_limit: float = 1.,
+                                 confidence: float = 0.95, chunk_size: int = 2**16,
+                                 processes: int = None, seed: int = None) -> SnReliability:
+        """
+        returns the failure probability of load spectra by Monte Carlo evaluation of scattered
+        S-N curves
+
+        Every sample draws the scattered parameters, evaluates the damage of the spectra
+        according to Palmgren-Miner (see calc_damage) and fails once the damage reaches
+        damage_limit. A single load level is a spectrum with one bin. The samples are evaluated
+        in chunks of chunk_size as one SnCurveTable, the bins of a chunk in blocks of at most 
+        _DAMAGE_ELEMENTS // chunk_size bins (at least one). Every array of a chunk therefore 
+        holds at most max(_DAMAGE_ELEMENTS, chunk_size) elements (16 MB by default) times the 
+        number of spectra for the totals, independent of the number of bins. Every chunk has its 
+        own random stream spawned from seed, the result for a seed and chunk_size does not 
+        depend on processes.
+
+        Args:
+            stress_F (np.ndarray): tooth root stress of every bin
+            stress_H (np.ndarray): flank stress of every bin
+            cycles (np.ndarray): number of load cycles of every bin, bins are along the last
+                                 axis, leading axes are independent spectra
+            scatter (dict): SnScatter of the scattered parameters, keys are the numeric
+                            attributes, e.g. 'sig_FE', 'N_F_d', and 'load' for a factor on all
+                            stresses of a sample
+            samples (int, optional): number of samples. Defaults to 10**6.
+            damage_limit (float, optional): damage at failure. Defaults to 1.
+            confidence (float, optional): confidence level of the intervals. Defaults to 0.95.
+            chunk_size (int, optional): number of samples per chunk. Defaults to 2**16.
+            processes (int, optional): number of worker processes. Defaults to None, no worker
+                                       processes.
+            seed (int, optional): seed of the random streams. Defaults to None, not reproducible.
+
+        Returns:
+            SnReliability: failure probabilities and confidence intervals with the shape of
+                           the leading axes of the spectra
+        """
+
+        for name in scatter:
+            if name not in ('load',) + _PARAMETERS[:8]:
+                raise ValueError(f'{name} can not be scattered')
+        stress_F, stress_H, cycles = np.broadcast_arrays(*(np.asarray(x, dtype=float) for x in
+                                                           (stress_F, stress_H, cycles)))
+        shape = stress_F.shape[:-1]
+        # spectra of all cases side by side, one row per sample
+        spectra = tuple(x.reshape(-1) for x in (stress_F, stress_H, cycles))
+        parameters = tuple(getattr(self, name) for name in _PARAMETERS)
+
+        sizes = [min(chunk_size, samples - start) for start in range(0, samples, chunk_size)]
+        streams = np.random.SeedSequence(seed).spawn(len(sizes))
+        tasks = [(parameters, scatter, spectra, stress_F.shape[-1], damage_limit, size, stream)
+                 for size, stream in zip(sizes, streams)]
+
+        if not processes or processes <= 1 or len(tasks) <= 1:
+            counts = [_failure_counts(*task) for task in tasks]
+        else:
+            from concurrent.futures import ProcessPoolExecutor
+
+            with ProcessPoolExecutor(processes) as executor:
+                counts = list(executor.map(_failure_counts, *zip(*tasks)))
+
+        failures_F, failures_H, failures = (sum(c[i] for c in counts).reshape(shape) for i in range(3))
+        probabilities = [f / samples for f in (failures_F, failures_H, failures)]
+        intervals = [_wilson_interval(f, samples, confidence) for f in (failures_F, failures_H, failures)]
+        return SnReliability(samples, failures_F, failures_H, failures, *probabilities, *intervals)
+
     
-    def write_dat_file(self):
+    def write_dat_file(self, directory: str = '.') -> str:
         '''
-        creates and saves dat-file
+        creates and saves dat-file WL_<name>.dat
         creates some interpolation points
+
+        Args:
+            directory (str, optional): output directory. Defaults to the working directory.
+
+        Returns:
+            str: path of the written file
         '''
         
-        # create list of numbers from 100 to 10^99
-        a1 = np.geomspace(1000, 1e10, 8)
-        a2 = np.arange(1,10,1)
-        NL = np.outer(a1, a2).flatten()
-        NL = NL.tolist()
-        NL.append(1e99)
-        NL_mod = NL
-        NL_mod.insert(0, 0e0)
-        sig_perm_F = []
-        sig_perm_H = []
-        
-        for number in NL_mod:
-            foot, flank = self.calc_sig_perm(number)
-            sig_perm_F.append(foot)
-            sig_perm_H.append(flank)
-        
-        #inhalt = [sheet['A20':'D47'],sheet['F20':'I47'],sheet['K20':'N47'],sheet['P20':'S47'],sheet['U20':'X47'],sheet['Z20':'AC47'],sheet['AE20':'AH47'],sheet['AJ20':'AM47'],sheet['AO20':'AR47'],sheet['AT20':'AW47'],sheet['AY20':'BB47'],sheet['BD20':'BG47'],sheet['BI20':'BL47']]
-        #inhalt = [list(i) for i in inhalt]
-        #werkstoff = [sheet['B3'].value,sheet['G3'].value, sheet['L3'].value, sheet['Q3'].value, sheet['V3'].value, sheet['AA3'].value, sheet['AF3'].value, sheet['AK3'].value, sheet['AP3'].value, sheet['AU3'].value, sheet['AZ3'].value, sheet['BE3'].value, sheet['BJ3'].value] 
-        
-        # Schreiben der neuen Dateien   
-        # Dateipfad und Name und Deklarierung als 'f'
-        #with open("I:\\Technische_Berechnung\\Projekte\\AT\\Grundlagenuntersuchungen\\150427 Eigene Wöhlerlinien in KISSsoft\\Textdateien_Woehlerlinien_DNV_KISSsoft\\WL_" + "0" + "_" + self.name + ".dat", "w") as f:
-        with open("WL_" + self.name + ".dat", "w") as f:
-            f.write("-- -----------------------------------------------------------\n")
-            f.write("-- File = WL_" + self.name + ".dat" + "\n")
-            f.write("-- Erstellt am " + (time.strftime("%d/%m/%Y")) + " von Jürgen Hammele\n\n")
-            f.write("-- Werte nach DNV Report ER-DE-ISO6336-04848-1 vom 02.05.2019\n")
-            #f.write("-- Werkstoff " + werkstoff[i] + "\n")
-            f.write("-- -----------------------------------------------------------\n\n")
-            
-            # Ausgabe von Schwingspielanzahl
-            f.write("-- Data for significant no. of cycles (edge points for interpolation of Woehler line)\n")
-            f.write(":TABLE FUNCTION EdgeCycle\n")
-            f.write("\tINPUT X number TREAT NEXT_BIGGER\n")
-            f.write("DATA\n\t")
-            for i in range(len(NL)):
-                f.write(str(i+1) + "\t")
-            f.write("\n\t")
-            for number in NL:
-                f.write(str('{:.0e}'.format(number)) + "\t")
-            f.write("\nEND\n\n")
-            
-            # Ausgabe von ertragbarer Spannung Flanke
-            f.write("-- Data for Hertzian pressure sigH\n")
-            f.write(":TABLE FUNCTION FlankSigH\n")
-            f.write("\tINPUT X Cycles TREAT LOG\n")
-            f.write("DATA\n\t")
-            for number in NL_mod:
-                f.write(str('{:.0e}'.format(number)) + "\t")
-            f.write("\n\t")
-            for sig in sig_perm_H:
-                f.write(str('{:.1f}\t'.format(sig)))
-            f.write("\nEND\n\n")
-            
-            # Ausgabe von ertragbarer Spannung Fuss
-            f.write("-- Data for fatigue strength tooth root sigF\n")
-            f.write(":TABLE FUNCTION FootSigF\n")
-            f.write("\tINPUT X Cycles TREAT LOG\n")
-            f.write("DATA\n\t")
-            for number in NL_mod:
-                f.write(str('{:.0e}'.format(number)) + "\t")
-            f.write("\n\t")
-            for sig in sig_perm_F:
-                f.write(str('{:.1f}\t'.format(sig/2)))
-            f.write("\nEND\n\n")
-
-
-# create list with standard materials of COB
-materials_COB = []
-materials_COB.append(SnCurveIso6336('AT-01_18CrNiMo7-6(COB)_LN_190-3', 1e3,3e6,2520,1050,1e5,5e7,2400,1550,0,0))
-materials_COB.append(SnCurveIso6336('AT-02_18CrNiMo7-6(COB)_LN_190-3_lim_pit_perm', 1e3,3e6,2520,1050,6e5,1e9,2400,1550,1,0))
-materials_COB.append(SnCurveIso6336('AT-03_18CrNiMo7-6(COB)_LN_190-3_shot_peened_LN_523-1', 1e3,3e6,2520,1400,1e5,5e7,2400,1800,0,0))
-materials_COB.append(SnCurveIso6336('AT-04_18CrNiMo7-6(COB)_LN_190-3_lim_pit_perm_shot_peened_LN_523-1', 1e3,3e6,2520,1400,6e5,1e9,2400,1800,1,0))
-materials_COB.append(SnCurveIso6336('AT-05_20MnCr5(COB)_LN_190-2', 1e3,3e6,2520,1050,1e5,5e7,2400,1550,0,0))
-materials_COB.append(SnCurveIso6336('AT-06_20MnCr5(COB)_LN_190-2_lim_pit_perm', 1e3,3e6,2520,1050,6e5,1e9,2400,1550,1,0))
-materials_COB.append(SnCurveIso6336('AT-07_20MnCr5(COB)_LN_190-2_shot_peened_LN_523-1', 1e3,3e6,2520,1400,1e5,5e7,2400,1800,0,0))
-materials_COB.append(SnCurveIso6336('AT-08_20MnCr5(COB)_LN_190-2_lim_pit_perm_shot_peened_LN_523-1', 1e3,3e6,2520,1400,6e5,1e9,2400,1800,1,0))
-materials_COB.append(SnCurveIso6336('AT-09_42CrMo4(COB)_LN_194-1', 1e3,3e6,1440,900,1e5,2e6,1430,1100,0,0))
-materials_COB.append(SnCurveIso6336('AT-10_18CrNiMo7-6(COB)_LN_190-3_shot_peened_LN_523-2', 1e3,3e6,2520,1250,1e5,5e7,2400,1700,0,0))
-materials_COB.append(SnCurveIso6336('AT-11_18CrNiMo7-6(COB)_LN_190-3_lim_pit_perm_shot_peened_LN_523-2', 1e3,3e6,2520,1250,6e5,1e9,2400,1700,1,0))
-materials_COB.append(SnCurveIso6336('AT-12_20MnCr5(COB)_LN_190-2_shot_peened_LN_523-2', 1e3,3e6,2520,1250,1e5,5e7,2400,1700,0,0))
-materials_COB.append(SnCurveIso6336('AT-13_20MnCr5(COB)_LN_190-2 _lim_pit_perm_shot_peened_LN_523-2', 1e3,3e6,2520,1250,6e5,1e9,2400,1700,1,0))
-materials_COB.append(SnCurveIso6336('AT-14_42CrMo4(COB)_LN 191-1_root_49_HRC_root_flank_56HRC', 1e3,3e6,1800,720,1e5,5e7,1952,1220,0,0))
-materials_COB.append(SnCurveIso6336('AT-15_42CrMo4(COB)_LN 191-1_root_49_HRC_root_flank_56HRC_lim_pit_perm', 1e3,3e6,1800,720,6e5,1e9,1952,1220,1,0))
-
-
-materials_ISO = []
+        # the tables are built once per distinct curve, see key
+        path = os.path.join(directory, "WL_" + self.name + ".dat")
+        with stage('dat.compute'):
+            text = _dat_file_text(self.name, *_curve_dat_rows(self.key), time.strftime("%d/%m/%Y"))
+        _write_text(path, text)
+        return path
+
+def _take_segments(x: np.ndarray, bounds: np.ndarray, y_ref: np.ndarray, x_ref: np.ndarray, 
+                   exponent: np.ndarray) -> np.ndarray:
+    '''
+    evaluates segments of many curves at once
+
+    Args:
+        x (np.ndarray): values of shape (M, K) or (1, K)
+        bounds (np.ndarray): upper bounds of the segments of every curve, shape (M, n-1)
+        y_ref, x_ref, exponent (np.ndarray): segment coefficients, shape (M, n)
+
+    Returns:
+        np.ndarray: y_ref * (x_ref / x)**exponent of the segment of every element, shape (M, K)
+    '''
+
+    # segment index = number of bounds < x, one comparison per bound keeps memory at (M, K)
+    k = np.zeros(np.broadcast_shapes(x.shape, bounds[:, :1].shape), dtype=np.intp)
+    for j in range(bounds.shape[1]):
+        k += x > bounds[:, j:j+1]
+    take = np.take_along_axis
+    return _power_law(x, take(y_ref, k, axis=1), take(x_ref, k, axis=1), take(exponent, k, axis=1))
+
+
+# largest table that keeps its segments, see SnCurveTable
+_SEGMENT_ROWS = 2**16
+
+
+def _columns(parameters) -> tuple:
+    '''returns the column names of a dict, structured array or DataFrame'''
+    names = getattr(getattr(parameters, 'dtype', None), 'names', None)
+    return names if names is not None else tuple(parameters.keys())
+
+
+class SnCurveTable:
+    '''
+    Columnar table of S-N curves for evaluating many materials at once
+
+    The attributes of SnCurveIso6336 are stored as one NumPy array per attribute, every method 
+    evaluates all M materials for K values with one broadcast and returns arrays of shape (M, K). 
+    A material takes 66 bytes, tables of more than _SEGMENT_ROWS materials do not keep their 
+    segments and are evaluated in chunks of rows.
+    '''
+
+    __slots__ = ('names',) + _PARAMETERS + ('_segments',)
+
+    def __init__(self, names: list, N_F_stat, N_F_d, sig_FP_stat, sig_FE, N_H_stat, N_H_d, 
+                 sig_HP_stat, sig_H_lim, lim_pit_perm=False, red_life_fac=False, validate: bool = True):
+        """
+        Args:
+            names (list): material names, None for the row indices
+            all others: arrays (or scalars, broadcast to all materials) with the attributes of 
+                        SnCurveIso6336, see there
+            validate (bool, optional): check the parameters, see invalid_parameters. Defaults 
+                                       to True.
+
+        Raises:
+            ValueError: if a material violates a constraint, the message holds the offending 
+                        rows
+        """
+
+        values = np.broadcast_arrays(N_F_stat, N_F_d, sig_FP_stat, sig_FE, N_H_stat, N_H_d, 
+                                     sig_HP_stat, sig_H_lim, lim_pit_perm, red_life_fac)
+        for name, value in zip(_PARAMETERS, values):
+            dtype = bool if name in ('lim_pit_perm', 'red_life_fac') else float
+            array = np.array(value, dtype=dtype).reshape(-1)
+            array.flags.writeable = False
+            setattr(self, name, array)
+        # a range takes no memory per material
+        self.names = range(len(self.N_F_stat)) if names is None else list(names)
+        if len(self.names) != len(self.N_F_stat):
+            raise ValueError(f'{len(self.names)} names for {len(self.N_F_stat)} materials')
+        if validate:
+            _check_parameters(*(getattr(self, name) for name in _PARAMETERS))
+        self._segments = None
+
+    @classmethod
+    def from_arrays(cls, parameters, names: list = None) -> 'SnCurveTable':
+        """
+        Builds and validates a table from columns of parameters, e.g. of a parameter sweep
+
+        Args:
+            parameters: dict, structured array or DataFrame with one column per attribute of 
+                        SnCurveIso6336, lim_pit_perm and red_life_fac default to False
+            names (list, optional): material names. Defaults to None, the row indices.
+
+        Raises:
+            ValueError: if a material violates a constraint, see invalid_parameters
+        """
+
+        def column(name):
+            if name in ('lim_pit_perm', 'red_life_fac') and name not in _columns(parameters):
+                return False
+            return parameters[name]
+
+        return cls(names, *(column(name) for name in _PARAMETERS))
+
+    @classmethod
+    def from_curves(cls, materials: list) -> 'SnCurveTable':
+        """
+        Args:
+            materials (list): list of SnCurveIso6336 objects, e.g. materials_COB
+        """
+        columns = [[getattr(material, name) for material in materials] for name in _PARAMETERS]
+        return cls([material.name for material in materials], *columns)
+
+    def __len__(self) -> int:
+        return len(self.N_F_stat)
+
+    def __getitem__(self, index: int) -> SnCurveIso6336:
+        """returns material index as SnCurveIso6336 object"""
+        values = [getattr(self, name)[index].item() for name in _PARAMETERS]
+        return SnCurveIso6336(str(self.names[index]), *values)
+
+    def __repr__(self):
+        return f'SnCurveTable({len(self)} materials)'
+
+    @property
+    def segments(self) -> Tuple[tuple, SnSegments, SnSegments]:
+        """
+        slope, foot and flank segments of all materials, the fields of SnSegments have shape 
+        (M, n) with one row per material, only kept for tables of at most _SEGMENT_ROWS materials
+        """
+        if self._segments is not None:
+            return self._segments
+        segments = self._build_segments(slice(None))
+        if len(self) <= _SEGMENT_ROWS:
+            self._segments = segments
+        return segments
+
+    def _build_segments(self, rows: slice) -> Tuple[tuple, SnSegments, SnSegments]:
+        '''returns slope, foot and flank segments of the materials rows'''
+        slope, foot, flank = _build_segments(*(getattr(self, name)[rows] for name in _PARAMETERS))
+        return slope, SnSegments(*foot), SnSegments(*flank)
+
+    def _row_segments(self):
+        '''
+        yields rows, foot and flank segments of all materials at once, in chunks of 
+        _SEGMENT_ROWS materials for larger tables
+        '''
+        if len(self) <= _SEGMENT_ROWS:
+            _, foot, flank = self.segments
+            yield slice(None), foot, flank
+            return
+        for start in range(0, len(self), _SEGMENT_ROWS):
+            rows = slice(start, start + _SEGMENT_ROWS)
+            _, foot, flank = self._build_segments(rows)
+            yield rows, foot, flank
+
+    def _by_rows(self, evaluate, *inputs) -> tuple:
+        '''
+        returns evaluate(foot, flank, *inputs) of all materials, see _row_segments, inputs of 
+        shape (1, K) or (M, K)
+        '''
+        if len(self) <= _SEGMENT_ROWS:
+            _, foot, flank = self.segments
+            return evaluate(foot, flank, *inputs)
+        outputs = None
+        for rows, foot, flank in self._row_segments():
+            chunk = evaluate(foot, flank, *(x[rows] if len(x) > 1 else x for x in inputs))
+            if outputs is None:
+                outputs = tuple(np.empty((len(self),) + x.shape[1:]) for x in chunk)
+            for output, x in zip(outputs, chunk):
+                output[rows] = x
+        return outputs
+
+    @property
+    def slope(self) -> Tuple[np.ndarray]:
+        """
+        Exponents of the S-N curves of all materials, see SnCurveIso6336.slope
+
+        Returns:
+            tuple[np.ndarray]: p_F, p_H, p_H_lim_pit, p_F_red_life_fac, p_H_red_life_fac
+        """
+        return self.segments[0]
+
+    def calc_sig_perm(self, load_cycles: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        returns permissible stress for foot and flank of all materials
+
+        Args:
+            load_cycles (np.ndarray): Numbers of stress cycles, shape (K,) for the same cycles for 
+                                      all materials or (M, K)
+
+        Returns:
+            Tuple[np.ndarray, np.ndarray]: perm stress foot, perm stress flank, shape (M, K)
+        """
+
+        def evaluate(foot, flank, N):
+            return (_take_segments(N, foot.thresholds, foot.sig_ref, foot.N_ref, foot.exponent), 
+                    _take_segments(N, flank.thresholds, flank.sig_ref, flank.N_ref, flank.exponent))
+
+        return self._by_rows(evaluate, np.atleast_2d(np.asarray(load_cycles, dtype=float)))
+
+    def calc_N_perm(self, stress_F, stress_H=None) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        returns permissible number of load cycles for foot and flank of all materials, inverse
+        of calc_sig_perm, see SnCurveIso6336.calc_N_perm
+
+        Args:
+            stress_F (np.ndarray): tooth root stress, shape (K,) or (M, K)
+            stress_H (np.ndarray, optional): flank stress, shape (K,) or (M, K). Defaults to
+                                             None, stress_F is used for the flank as well.
+
+        Returns:
+            Tuple[np.ndarray, np.ndarray]: perm load cycles foot, perm load cycles flank,
+                                           shape (M, K)
+        """
+
+        sig_F = np.atleast_2d(np.asarray(stress_F, dtype=float))
+        sig_H = sig_F if stress_H is None else np.atleast_2d(np.asarray(stress_H, dtype=float))
+
+        def evaluate(foot, flank, sig_F, sig_H):
+            return (_take_segments(sig_F, foot.knees, foot.N_ref_inv, foot.sig_ref_inv, foot.p_inv),
+                    _take_segments(sig_H, flank.knees, flank.N_ref_inv, flank.sig_ref_inv, flank.p_inv))
+
+        return self._by_rows(evaluate, sig_F, sig_H)
+
+    def calc_damage(self, stress_F, stress_H, cycles) -> SnDamage:
+        """
+        returns damage of load spectra for foot and flank of all materials according to
+        Palmgren-Miner, see SnCurveIso6336.calc_damage
+
+        Args:
+            stress_F (np.ndarray): tooth root stress of every bin, shape (K,) or (M, K)
+            stress_H (np.ndarray): flank stress of every bin, shape (K,) or (M, K)
+            cycles (np.ndarray): number of load cycles of every bin, shape (K,) or (M, K)
+
+        Returns:
+            SnDamage: per_bin_F, per_bin_H of shape (M, K) and total_F, total_H of shape (M,)
+        """
+
+        N_F, N_H = self.calc_N_perm(stress_F, stress_H)
+        cycles = np.asarray(cycles, dtype=float)
+        per_bin_F, per_bin_H = _miner_damage(cycles, N_F), _miner_damage(cycles, N_H)
+        return SnDamage(per_bin_F, per_bin_H, per_bin_F.sum(axis=-1), per_bin_H.sum(axis=-1))
+
+
+class SnCurveRegistry:
+    '''
+    Registry of the distinct S-N curves of a list of materials
+
+    Materials with the same key (see SnCurveIso6336.key) are mapped onto one canonical curve,
+    the first registered material with this key. Bulk evaluations run on table, one row per
+    distinct curve, rows maps every registered material onto its row.
+    '''
+
+    def __init__(self, materials: list = ()):
+        """
+        Args:
+            materials (list, optional): list of SnCurveIso6336 objects to register
+        """
+
+        self.curves = []
+        self.names = []
+        self._rows = []
+        self._keys = {}
+        self._table = None
+        for material in materials:
+            self.add(material)
+
+    def add(self, material: SnCurveIso6336) -> int:
+        """
+        registers material
+
+        Returns:
+            int: row of the canonical curve of material
+        """
+
+        key = material.key
+        row = self._keys.get(key)
+        if row is None:
+            row = self._keys[key] = len(self.curves)
+            self.curves.append(material)
+            self._table = None
+        self.names.append(material.name)
+        self._rows.append(row)
+        return row
+
+    def __len__(self) -> int:
+        """returns the number of distinct curves"""
+        return len(self.curves)
+
+    def __repr__(self):
+        return f'SnCurveRegistry({len(self.names)} materials, {len(self)} distinct curves)'
+
+    def canonical(self, material: SnCurveIso6336) -> SnCurveIso6336:
+        """returns the registered curve with the key of material"""
+        return self.curves[self._keys[material.key]]
+
+    @property
+    def rows(self) -> np.ndarray:
+        """row in table of every registered material, in order of registration"""
+        return np.array(self._rows, dtype=np.intp)
+
+    @property
+    def table(self) -> SnCurveTable:
+        """SnCurveTable of the distinct curves, built once"""
+        if self._table is None:
+            self._table = SnCurveTable.from_curves(self.curves)
+        return self._table
+
+
+# elements of the damage grid of samples and bins evaluated at once, see calc_failure_probability
+_DAMAGE_ELEMENTS = 2**21
+
+
+def _failure_counts(parameters: tuple, scatter: dict, spectra: tuple, bins: int,
+                    damage_limit: float, size: int, stream: np.random.SeedSequence) -> tuple:
+    '''
+    evaluates one chunk of samples of SnCurveIso6336.calc_failure_probability
+
+    Returns:
+        tuple: number of failed samples of foot, flank and foot or flank for every spectrum
+    '''
+
+    rng = np.random.default_rng(stream)
+    values = list(parameters)
+    # parameters are drawn in a fixed order, independent of the order of scatter
+    for i, name in enumerate(_PARAMETERS):
+        if name in scatter:
+            values[i] = scatter[name].sample(parameters[i], size, rng)
+    load = scatter['load'].sample(1., size, rng)[:, None] if 'load' in scatter else 1.
+    stress_F, stress_H, cycles = spectra
+
+    # scattered samples may violate the constraints of the curve, e.g. sig_FE above sig_FP_stat
+    table = SnCurveTable(None, *(np.broadcast_to(value, size) for value in values), validate=False)
+    # the bins of all spectra side by side are evaluated in blocks of columns, the damage of every
+    # block is summed into the totals of its spectra, one spectrum per group of bins
+    total_F, total_H = np.zeros((2, size, len(cycles) // bins))
+    width = max(1, _DAMAGE_ELEMENTS // size)
+    for start in range(0, len(cycles), width):
+        columns = slice(start, start + width)
+        N_F, N_H = table.calc_N_perm(load * stress_F[columns], load * stress_H[columns])
+        spectrum = np.arange(start, min(start + width, len(cycles))) // bins
+        first = np.flatnonzero(np.diff(spectrum, prepend=-1))
+        total_F[:, spectrum[first]] += np.add.reduceat(_miner_damage(cycles[columns], N_F), first, axis=1)
+        total_H[:, spectrum[first]] += np.add.reduceat(_miner_damage(cycles[columns], N_H), first, axis=1)
+    failed_F, failed_H = total_F >= damage_limit, total_H >= damage_limit
+    return failed_F.sum(axis=0), failed_H.sum(axis=0), (failed_F | failed_H).sum(axis=0)
 
 
+def _build_materials_COB() -> list:
+    '''creates list with standard materials of COB'''
+    materials_COB = []
+    materials_COB.append(SnCurveIso6336('AT-01_18CrNiMo7-6(COB)_LN_190-3', 1e3,3e6,2520,1050,1e5,5e7,2400,1550,0,0))
+    materials_COB.append(SnCurveIso6336('AT-02_18CrNiMo7-6(COB)_LN_190-3_lim_pit_perm', 1e3,3e6,2520,1050,6e5,1e9,2400,1550,1,0))
+    materials_COB.append(SnCurveIso6336('AT-03_18CrNiMo7-6(COB)_LN_190-3_shot_peened_LN_523-1', 1e3,3e6,2520,1400,1e5,5e7,2400,1800,0,0))
+    materials_COB.append(SnCurveIso6336('AT-04_18CrNiMo7-6(COB)_LN_190-3_lim_pit_perm_shot_peened_LN_523-1', 1e3,3e6,2520,1400,6e5,1e9,2400,1800,1,0))
+    materials_COB.append(SnCurveIso6336('AT-05_20MnCr5(COB)_LN_190-2', 1e3,3e6,2520,1050,1e5,5e7,2400,1550,0,0))
+    materials_COB.append(SnCurveIso6336('AT-06_20MnCr5(COB)_LN_190-2_lim_pit_perm', 1e3,3e6,2520,1050,6e5,1e9,2400,1550,1,0))
+    materials_COB.append(SnCurveIso6336('AT-07_20MnCr5(COB)_LN_190-2_shot_peened_LN_523-1', 1e3,3e6,2520,1400,1e5,5e7,2400,1800,0,0))
+    materials_COB.append(SnCurveIso6336('AT-08_20MnCr5(COB)_LN_190-2_lim_pit_perm_shot_peened_LN_523-1', 1e3,3e6,2520,1400,6e5,1e9,2400,1800,1,0))
+    materials_COB.append(SnCurveIso6336('AT-09_42CrMo4(COB)_LN_194-1', 1e3,3e6,1440,900,1e5,2e6,1430,1100,0,0))
+    materials_COB.append(SnCurveIso6336('AT-10_18CrNiMo7-6(COB)_LN_190-3_shot_peened_LN_523-2', 1e3,3e6,2520,1250,1e5,5e7,2400,1700,0,0))
+    materials_COB.append(SnCurveIso6336('AT-11_18CrNiMo7-6(COB)_LN_190-3_lim_pit_perm_shot_peened_LN_523-2', 1e3,3e6,2520,1250,6e5,1e9,2400,1700,1,0))
+    materials_COB.append(SnCurveIso6336('AT-12_20MnCr5(COB)_LN_190-2_shot_peened_LN_523-2', 1e3,3e6,2520,1250,1e5,5e7,2400,1700,0,0))
+    materials_COB.append(SnCurveIso6336('AT-13_20MnCr5(COB)_LN_190-2 _lim_pit_perm_shot_peened_LN_523-2', 1e3,3e6,2520,1250,6e5,1e9,2400,1700,1,0))
+    materials_COB.append(SnCurveIso6336('AT-14_42CrMo4(COB)_LN 191-1_root_49_HRC_root_flank_56HRC', 1e3,3e6,1800,720,1e5,5e7,1952,1220,0,0))
+    materials_COB.append(SnCurveIso6336('AT-15_42CrMo4(COB)_LN 191-1_root_49_HRC_root_flank_56HRC_lim_pit_perm', 1e3,3e6,1800,720,6e5,1e9,1952,1220,1,0))
+    return materials_COB
+
+
+def _build_materials_ISO() -> list:
+    '''creates list with standard materials according to ISO 6336'''
+    return []
+
+
+# material catalogues, built on first access of the module attribute
+_CATALOGUES = {'materials_COB': _build_materials_COB, 'materials_ISO': _build_materials_ISO}
+
+
+def __getattr__(name: str):
+    if name in _CATALOGUES:
+        catalogue = _CATALOGUES[name]()
+        globals()[name] = catalogue
+        return catalogue
+    raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
+
+
+@timed('export')
 def export_data(materials: list):
     """
     Exports a list of materials to an Excel file
@@ -369,10 +1112,333 @@ def export_data(materials: list):
         materials (list): list of SN_curve_ISO_6336 objects
     """
     
-    df = pd.DataFrame([x.to_dict() for x in materials])
-    df.to_excel('out.xlsx', index=False)
+    import pandas as pd
+
+    with stage('export.compute'):
+        # one dictionary per distinct curve, copied with the name of every material
+        distinct = {}
+        rows = []
+        for x in materials:
+            key = x.key
+            if key not in distinct:
+                distinct[key] = x.to_dict()
+            rows.append(dict(distinct[key], name=x.name))
+    with stage('export.write'):
+        df = pd.DataFrame(rows)
+        df.to_excel('out.xlsx', index=False)
+
+
+def _dat_cycles() -> list:
+    '''returns the interpolation points of the dat-files, 0 and numbers from 10^3 to 10^99'''
+    
+    # create list of numbers from 100 to 10^99
+    a1 = np.geomspace(1000, 1e10, 8)
+    a2 = np.arange(1,10,1)
+    NL = np.outer(a1, a2).flatten()
+    NL = NL.tolist()
+    NL.append(1e99)
+    NL.insert(0, 0e0)
+    return NL
+
+
+@lru_cache(maxsize=None)
+def _dat_rows() -> Tuple[str, str]:
+    '''returns the index row and the cycles row of the dat-files, built once'''
+    NL = _dat_cycles()
+    return (''.join(str(i+1) + "\t" for i in range(len(NL))), 
+            ''.join('{:.0e}\t'.format(number) for number in NL))
+
+
+def _dat_value_rows(sig_perm_F: np.ndarray, sig_perm_H: np.ndarray) -> Tuple[str, str]:
+    '''returns the flank row and the foot row of permissible stresses of a dat-file'''
+    return (''.join('{:.1f}\t'.format(sig) for sig in np.asarray(sig_perm_H).tolist()), 
+            ''.join('{:.1f}\t'.format(sig) for sig in (np.asarray(sig_perm_F) / 2).tolist()))
+
+
+@lru_cache(maxsize=4096)
+def _curve_dat_rows(key: tuple) -> Tuple[str, str]:
+    '''returns the rows of permissible stresses of a dat-file once per distinct curve'''
+    coefficients = _shared_coefficients(key)
+    N = np.asarray(_dat_cycles(), dtype=float)
+    return _dat_value_rows(coefficients.foot.sig_perm(N), coefficients.flank.sig_perm(N))
+
+
+def _dat_file_text(name: str, flank_row: str, foot_row: str, date: str) -> str:
+    '''returns the content of the dat-file of material name, see write_dat_file and _dat_value_rows'''
+
+    index, cycles = _dat_rows()
+    
+    #inhalt = [sheet['A20':'D47'],sheet['F20':'I47'],sheet['K20':'N47'],sheet['P20':'S47'],sheet['U20':'X47'],sheet['Z20':'AC47'],sheet['AE20':'AH47'],sheet['AJ20':'AM47'],sheet['AO20':'AR47'],sheet['AT20':'AW47'],sheet['AY20':'BB47'],sheet['BD20':'BG47'],sheet['BI20':'BL47']]
+    #werkstoff = [sheet['B3'].value,sheet['G3'].value, sheet['L3'].value, sheet['Q3'].value, sheet['V3'].value, sheet['AA3'].value, sheet['AF3'].value, sheet['AK3'].value, sheet['AP3'].value, sheet['AU3'].value, sheet['AZ3'].value, sheet['BE3'].value, sheet['BJ3'].value] 
+    parts = [
+        "-- -----------------------------------------------------------\n",
+        "-- File = WL_" + name + ".dat" + "\n",
+        "-- Erstellt am " + date + " von Jürgen Hammele\n\n",
+        "-- Werte nach DNV Report ER-DE-ISO6336-04848-1 vom 02.05.2019\n",
+        #"-- Werkstoff " + werkstoff[i] + "\n",
+        "-- -----------------------------------------------------------\n\n",
+        
+        # Ausgabe von Schwingspielanzahl
+        "-- Data for significant no. of cycles (edge points for interpolation of Woehler line)\n",
+        ":TABLE FUNCTION EdgeCycle\n",
+        "\tINPUT X number TREAT NEXT_BIGGER\n",
+        "DATA\n\t",
+        index,
+        "\n\t",
+        cycles,
+        "\nEND\n\n",
+        
+        # Ausgabe von ertragbarer Spannung Flanke
+        "-- Data for Hertzian pressure sigH\n",
+        ":TABLE FUNCTION FlankSigH\n",
+        "\tINPUT X Cycles TREAT LOG\n",
+        "DATA\n\t",
+        cycles,
+        "\n\t",
+        flank_row,
+        "\nEND\n\n",
+        
+        # Ausgabe von ertragbarer Spannung Fuss
+        "-- Data for fatigue strength tooth root sigF\n",
+        ":TABLE FUNCTION FootSigF\n",
+        "\tINPUT X Cycles TREAT LOG\n",
+        "DATA\n\t",
+        cycles,
+        "\n\t",
+        foot_row,
+        "\nEND\n\n",
+    ]
+    return ''.join(parts)
+
+
+def _write_text(path: str, text: str):
+    '''writes text to path with a single write'''
+    #with open("I:\\Technische_Berechnung\\Projekte\\AT\\Grundlagenuntersuchungen\\150427 Eigene Wöhlerlinien in KISSsoft\\Textdateien_Woehlerlinien_DNV_KISSsoft\\WL_" + "0" + "_" + self.name + ".dat", "w") as f:
+    with stage('dat.io'), open(path, "w") as f:
+        f.write(text)
+
+
+def _write_dat_files(names: list, value_rows: list, directory: str, date: str) -> list:
+    '''builds and writes the dat-files of names, one pair of rows of _dat_value_rows per name'''
+    paths = []
+    for name, (flank_row, foot_row) in zip(names, value_rows):
+        path = os.path.join(directory, "WL_" + name + ".dat")
+        with stage('dat.compute'):
+            text = _dat_file_text(name, flank_row, foot_row, date)
+        _write_text(path, text)
+        paths.append(path)
+    return paths
+
+
+def write_dat_files(materials: list, directory: str = '.', processes: int = None) -> list:
+    """
+    Creates and saves the dat-files of a list of materials, see SnCurveIso6336.write_dat_file
+
+    The tables of all distinct curves (see SnCurveRegistry) are evaluated and formatted once in 
+    one vectorized pass, every file is built in memory and written with a single write. The 
+    output is identical to write_dat_file.
+
+    Args:
+        materials (list): list of SnCurveIso6336 objects
+        directory (str, optional): output directory, created if missing. Defaults to the 
+                                   working directory.
+        processes (int, optional): number of worker processes building and writing the files. 
+                                   Defaults to None, no worker processes.
+
+    Returns:
+        list: paths of the written files in order of materials
+    """
+
+    os.makedirs(directory, exist_ok=True)
+    with stage('dat.compute'):
+        registry = SnCurveRegistry(materials)
+        sig_perm_F, sig_perm_H = registry.table.calc_sig_perm(_dat_cycles())
+        distinct_rows = [_dat_value_rows(foot, flank) for foot, flank in zip(sig_perm_F, sig_perm_H)]
+        names = registry.names
+        value_rows = [distinct_rows[row] for row in registry.rows]
+    date = time.strftime("%d/%m/%Y")
+
+    if not processes or processes <= 1 or len(materials) <= 1:
+        return _write_dat_files(names, value_rows, directory, date)
+
+    # contiguous blocks of materials, one task per block and process
+    from concurrent.futures import ProcessPoolExecutor
+
+    blocks = np.array_split(np.arange(len(names)), processes)
+    with ProcessPoolExecutor(processes) as executor:
+        futures = [executor.submit(_write_dat_files, [names[i] for i in block], 
+                                   [value_rows[i] for i in block], directory, date) 
+                   for block in blocks if len(block)]
+        return [path for future in futures for path in future.result()]
+
+class SnDatTable(NamedTuple):
+    '''
+    Tables of a dat-file written by SnCurveIso6336.write_dat_file
+
+    sig_perm_F is the permissible tooth root stress, i.e. twice the FootSigF values of the file.
+    '''
+
+    name: str
+    cycles: np.ndarray
+    sig_perm_F: np.ndarray
+    sig_perm_H: np.ndarray
+
+    def matches(self, curve: 'SnCurveIso6336', tol: float = 0.05) -> Tuple[bool, bool]:
+        """
+        Checks whether the curve reproduces the tables
 
+        Args:
+            curve (SnCurveIso6336): S-N curve
+            tol (float, optional): permitted deviation in units of the file. Defaults to 0.05, 
+                                   the rounding of the file.
+
+        Returns:
+            Tuple[bool, bool]: foot table reproduced, flank table reproduced
+        """
+        sig_perm_F, sig_perm_H = curve.calc_sig_perm_array(self.cycles)
+        return (bool(np.all(np.abs(sig_perm_F - self.sig_perm_F) / 2 <= tol + 1e-9)), 
+                bool(np.all(np.abs(sig_perm_H - self.sig_perm_H) <= tol + 1e-9)))
+
+    def to_curve(self, tol: float = 0.05) -> 'SnCurveIso6336':
+        """
+        Rebuilds the S-N curve of the tables
+
+        Static and endurance limits are read from the plateaus, limited pitting and reduced life 
+        factors are detected from the shape of the tables. The knee points are taken from the 
+        plateau ends on the cycle grid or, if they are not on the grid, from the intersections 
+        of the fitted slopes with the plateaus.
+
+        Args:
+            tol (float, optional): permitted deviation of the rebuilt curve in units of the file, 
+                                   see matches. Defaults to 0.05.
+
+        Returns:
+            SnCurveIso6336: S-N curve reproducing the tables
+
+        Raises:
+            ValueError: no S-N curve reproduces the tables
+        """
+
+        N = self.cycles
+        for red_life_fac in (False, True):
+            foot = [(N_stat, N_d, self.sig_perm_F[0], sig_E) 
+                    for sig_E in _dat_endurance(self.sig_perm_F, red_life_fac) 
+                    for N_stat, N_d in _dat_knees(N, self.sig_perm_F, self.sig_perm_F[0], sig_E)]
+            flank = [(N_stat, N_d, self.sig_perm_H[0], sig_E, lim_pit_perm) 
+                     for lim_pit_perm in (False, True) 
+                     for sig_E in _dat_endurance(self.sig_perm_H, red_life_fac) 
+                     for N_stat, N_d in _dat_knees(N, self.sig_perm_H, self.sig_perm_H[0], sig_E, 
+                                                   1e7 if lim_pit_perm else None)]
+            # foot and flank are independent, the foot is fitted first with a dummy flank
+            candidates = ((F, _dat_candidate(self.name, *F, *F, False, red_life_fac)) for F in foot)
+            foot = next((F for F, curve in candidates if curve is not None and self.matches(curve, tol)[0]), 
+                        None)
+            if foot is None:
+                continue
+            for H in flank:
+                curve = _dat_candidate(self.name, *foot, *H, red_life_fac)
+                if curve is not None and self.matches(curve, tol)[1]:
+                    return curve
+        raise ValueError(f'no S-N curve reproduces the tables of {self.name}')
+
+
+def _dat_candidate(name: str, *parameters) -> SnCurveIso6336:
+    '''returns the candidate curve of SnDatTable.to_curve, None if its knees are degenerate'''
+    try:
+        return SnCurveIso6336(name, *parameters)
+    except ValueError:
+        return None
+
+
+def _dat_endurance(sig: np.ndarray, red_life_fac: bool) -> list:
+    '''returns candidates for the endurance limit of one side of a dat-file table'''
+    if not red_life_fac:
+        return [sig[-1]]
+    # the table holds 0.85 * endurance limit after rounding, the limit itself if a knee is on the grid
+    sig_E = sig[-1] / 0.85
+    on_grid = sig[np.abs(sig - sig_E) <= 0.5]
+    return list(dict.fromkeys([round(sig_E, 1), float(round(sig_E))] + on_grid.tolist()))
+
+
+def _dat_knees(N: np.ndarray, sig: np.ndarray, sig_stat: float, sig_E: float, split: float = None) -> list:
+    '''
+    returns candidates (N_stat, N_d) for the knee points of one side of a dat-file table
+
+    Args:
+        split (float, optional): load cycles between the two slopes of limited pitting
+    '''
 
+    candidates = []
+    plateau = np.flatnonzero(sig >= sig_stat)
+    endurance = np.flatnonzero(sig <= sig_E)
+    if len(plateau) and len(endurance):
+        candidates.append((N[plateau[-1]].item(), N[endurance[0]].item()))
+
+    sloped = (sig < sig_stat) & (sig > sig_E) & (N > 0)
+    first = sloped & (N <= split) if split else sloped
+    second = sloped & (N > split) if split else sloped
+    if first.sum() >= 2 and second.sum() >= 2:
+        knees = []
+        for points, level in ((first, sig_stat), (second, sig_E)):
+            b, a = np.polyfit(np.log(N[points]), np.log(sig[points]), 1)
+            knees.append(float('{:.3g}'.format(np.exp((np.log(level) - a) / b))))
+        candidates.append(tuple(knees))
+    return candidates
+
+
+def read_dat_file(path: str) -> SnDatTable:
+    """
+    Reads the tables of a dat-file written by SnCurveIso6336.write_dat_file
+
+    Args:
+        path (str): path of the dat-file
+
+    Returns:
+        SnDatTable: name, cycles and permissible stresses of foot and flank
+    """
+
+    with open(path, encoding='latin-1') as f:
+        text = f.read()
+
+    name = re.search(r'^-- File = WL_(.*)\.dat$', text, re.MULTILINE)
+    name = name.group(1) if name else os.path.splitext(os.path.basename(path))[0]
+    tables = {}
+    for table, data in re.findall(r'^:TABLE FUNCTION (\w+)\n.*?^DATA\n(.*?)^END', text, 
+                                  re.MULTILINE | re.DOTALL):
+        tables[table] = [np.array(row.split(), dtype=float) for row in data.splitlines() if row.strip()]
+
+    try:
+        cycles = tables['FlankSigH'][0]
+        return SnDatTable(name, cycles, 2 * tables['FootSigF'][1], tables['FlankSigH'][1])
+    except (KeyError, IndexError):
+        raise ValueError(f'{path} is no S-N curve dat-file') from None
+
+
+def read_dat_files(directory: str = '.', pattern: str = 'WL_*.dat', processes: int = None) -> dict:
+    """
+    Reads all dat-files of a directory, see read_dat_file
+
+    Args:
+        directory (str, optional): directory to scan. Defaults to the working directory.
+        pattern (str, optional): file name pattern. Defaults to 'WL_*.dat'.
+        processes (int, optional): number of worker processes. Defaults to None, no worker 
+                                   processes.
+
+    Returns:
+        dict: SnDatTable per path, sorted by path
+    """
+
+    paths = sorted(glob.glob(os.path.join(glob.escape(directory), pattern)))
+    if not processes or processes <= 1:
+        return {path: read_dat_file(path) for path in paths}
+
+    from concurrent.futures import ProcessPoolExecutor
+
+    with ProcessPoolExecutor(processes) as executor:
+        chunksize = max(1, len(paths) // (4 * processes))
+        return dict(zip(paths, executor.map(read_dat_file, paths, chunksize=chunksize)))
+
+@timed('plot')
 def plot_SN_curve_flank(materials: list):
     '''plots the S-N curves in one plot for flank of all materials in a list of SN_curve_ISO_6336 objects
     
@@ -382,6 +1448,9 @@ def plot_SN_curve_flank(materials: list):
         materials (list): list of SN_curve_ISO_6336 objects
         '''
     
+    import matplotlib.pyplot as plt
+    from matplotlib.ticker import (ScalarFormatter, MultipleLocator)
+    
     names = []
     S_stat_values = []
     S_D_values = []
@@ -390,17 +1459,17 @@ def plot_SN_curve_flank(materials: list):
     for material in materials:
         N_lim_perm = material.N_H_stat if material.lim_pit_perm == 0 else 1e7
         sig_H_lim_perm = material.sig_HP_stat if material.lim_pit_perm == 0 else 0.5*(material.sig_H_lim+material.sig_HP_stat)
-        material.sig_H_lim_red_life_fac = material.sig_H_lim if material.red_life_fac ==0 else 0.85 * material.sig_H_lim
+        sig_H_lim_red_life_fac = material.sig_H_lim if material.red_life_fac ==0 else 0.85 * material.sig_H_lim
         
         N = [1, material.N_H_stat, N_lim_perm, material.N_H_d, 1e10]
-        stress = [material.sig_HP_stat, material.sig_HP_stat, sig_H_lim_perm, material.sig_H_lim, material.sig_H_lim_red_life_fac]
+        stress = [material.sig_HP_stat, material.sig_HP_stat, sig_H_lim_perm, material.sig_H_lim, sig_H_lim_red_life_fac]
 
         plt.loglog(N, stress, '-')
 
         names.append(material.name)
         S_stat_values.append(material.sig_HP_stat)
         S_D_values.append(material.sig_H_lim)
-        S_D_red_life_values.append(material.sig_H_lim_red_life_fac)
+        S_D_red_life_values.append(sig_H_lim_red_life_fac)
     all_values = list(set(S_stat_values + S_D_values + S_D_red_life_values))
     min_value = math.floor(min(all_values)/100.)*100
     max_value = math.ceil(max(all_values)/100.)*100
@@ -433,6 +1502,7 @@ def plot_SN_curve_flank(materials: list):
     plt.show()
     
 
+@timed('plot')
 def plot_SN_curve_foot(materials: list):
     '''plots the S-N curves in one plot for foot of all materials in a list of SN_curve_ISO_6336 objects
     
@@ -442,23 +1512,26 @@ def plot_SN_curve_foot(materials: list):
         materials (list): list of SN_curve_ISO_6336 objects
         '''
     
+    import matplotlib.pyplot as plt
+    from matplotlib.ticker import (ScalarFormatter, MultipleLocator)
+    
     names = []
     S_stat_values = []
     S_D_values = []
     S_D_red_life_values = []
     
     for material in materials:
-        material.sig_FE_red_life_fac = material.sig_FE if material.red_life_fac ==0 else 0.85 * material.sig_FE
+        sig_FE_red_life_fac = material.sig_FE if material.red_life_fac ==0 else 0.85 * material.sig_FE
         
         N = [1, material.N_F_stat, material.N_F_d, 1e10]
-        stress = [material.sig_FP_stat, material.sig_FP_stat, material.sig_FE, material.sig_FE_red_life_fac]
+        stress = [material.sig_FP_stat, material.sig_FP_stat, material.sig_FE, sig_FE_red_life_fac]
 
         plt.loglog(N, stress, '-')
 
         names.append(material.name)
         S_stat_values.append(material.sig_FP_stat)
         S_D_values.append(material.sig_FE)
-        S_D_red_life_values.append(material.sig_FE_red_life_fac)
+        S_D_red_life_values.append(sig_FE_red_life_fac)
     all_values = list(set(S_stat_values + S_D_values + S_D_red_life_values))
     min_value = math.floor(min(all_values)/100.)*100
     max_value = math.ceil(max(all_values)/100.)*100
@@ -492,6 +1565,7 @@ def plot_SN_curve_foot(materials: list):
     plt.savefig('sn_curve_foot.pdf', format='pdf')
     plt.show()
 
-y = materials_COB[3]
-print(y)
-# y.write_dat_file()
\ No newline at end of file
+if __name__ == '__main__':
+    y = _build_materials_COB()[3]
+    print(y)
+    # y.write_dat_file()
@@ -0,0 +1,247 @@
+"""
+Inverse design: maximum load scale factor of load spectra for a list of materials
+
+For every pair of load spectrum (gear) and material the largest factor s is searched so that
+the Palmgren-Miner damage of the spectrum scaled by s stays at or below the damage limit, for
+foot and flank. The damage is a smooth sum of powers of s between the factors at which a bin
+reaches a knee of the S-N curve. The interval holding the solution is found by bisection over
+these breakpoints, within it the solution is closed form if all damaging bins have the same
+slope and otherwise found by a few Newton steps in log-log coordinates. The search of every pair
+is bracketed by the endurance limit (no damage below) and the static limit (infinite damage
+above), pairs whose damage at the static limit is within the damage limit are done at once.
+
+All pairs are solved at once on the distinct curves of the materials (see SnCurveRegistry),
+in chunks of pairs to bound the memory. A chunk holds at most _DESIGN_ELEMENTS // K pairs of
+spectra with K bins, every array of a chunk at most about _DESIGN_ELEMENTS elements (16 MB by
+default), independent of the length of the spectra.
+"""
+
+from typing import NamedTuple
+
+import numpy as np
+
+from sn_curve_iso_6336 import SnCurveRegistry, _miner_damage, _power_law
+
+
+# elements of the arrays of pairs and bins of one chunk, see module documentation
+_DESIGN_ELEMENTS = 2**21
+
+
+class SnDesign(NamedTuple):
+    '''
+    Maximum load scale factors of load spectra per material for foot, flank and the gear (foot
+    and flank), shape (..., M) with the leading axes of the spectra and one column per material.
+    inf if the spectrum does no damage at any scale. passes is scale >= 1.
+    '''
+
+    scale_F: np.ndarray
+    scale_H: np.ndarray
+    scale: np.ndarray
+    passes: np.ndarray
+
+
+def _segment_index(x: np.ndarray, knees: np.ndarray) -> np.ndarray:
+    '''returns the inverse segment of every element of x, the number of knees < x, see _take_segments'''
+    k = np.zeros(x.shape, dtype=np.intp)
+    for j in range(knees.shape[1]):
+        k += x > knees[:, j:j+1]
+    return k
+
+
+def _damage(s: np.ndarray, sig: np.ndarray, cycles: np.ndarray, segments: tuple) -> np.ndarray:
+    '''
+    returns the damage of the spectra sig scaled by s
+
+    Args:
+        s (np.ndarray): scale factors, shape (P,)
+        sig, cycles (np.ndarray): stress and load cycles of every bin, shape (P, K)
+        segments (tuple): knees, N_ref_inv, sig_ref_inv, p_inv of the curve of every pair,
+                          shape (P, n)
+    '''
+
+    knees, N_ref, sig_ref, p_inv = segments
+    x = s[:, None] * sig
+    k = _segment_index(x, knees)
+    take = np.take_along_axis
+    N_perm = _power_law(x, take(N_ref, k, axis=1), take(sig_ref, k, axis=1), take(p_inv, k, axis=1))
+    return _miner_damage(cycles, N_perm).sum(axis=1)
+
+
+def _log_damage(c: np.ndarray, p: np.ndarray, u: np.ndarray) -> tuple:
+    '''
+    returns ln D and d ln D / d ln s at ln s = u of damages D = sum(exp(c + p ln s)) over the
+    last axis, c and p of shape (P, K)
+    '''
+    terms = c + p * u[:, None]
+    top = terms.max(axis=1)
+    # no damaging bin gives ln D = -inf
+    top = np.where(np.isfinite(top), top, 0.)
+    weights = np.exp(terms - top[:, None])
+    total = weights.sum(axis=1)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return top + np.log(total), (weights * p).sum(axis=1) / total
+
+
+def _solve(sig: np.ndarray, cycles: np.ndarray, segments: tuple, damage_limit: float, rtol: float,
+           max_iter: int) -> np.ndarray:
+    '''returns the maximum scale factor of every pair, see _damage for the arguments'''
+
+    knees, N_ref, sig_ref, p_inv = segments
+    loaded = np.where(cycles > 0, sig, 0.).max(axis=1)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        # no damage at or below the endurance limit, infinite damage above the static limit
+        lo, hi = knees[:, 0] / loaded, knees[:, -1] / loaded
+    scale = hi.copy()
+
+    todo = np.flatnonzero(np.isfinite(hi))
+    active = _damage(hi[todo], sig[todo], cycles[todo], [a[todo] for a in segments]) > damage_limit
+    pairs = todo[active]
+    if not len(pairs):
+        return scale
+    sig, cycles, lo, hi = sig[pairs], cycles[pairs], lo[pairs], hi[pairs]
+    knees, N_ref, sig_ref, p_inv = (a[pairs] for a in segments)
+
+    # the damage is smooth between the scale factors at which a bin crosses a knee, the
+    # interval holding the solution is found by bisection over these breakpoints, knee by knee.
+    # The breakpoints of knee j over the bins sorted by descending stress are ascending, they are
+    # computed where needed. lo (damage within the limit) and hi (above) narrow with every step,
+    # breakpoints outside (lo, hi) need no evaluation.
+    sig_sorted = -np.sort(-np.where(cycles > 0, sig, 0.), axis=1)
+    # the stress at lo must not be rounded above the endurance limit
+    lo = np.nextafter(lo, 0)
+    K = sig.shape[1]
+    for j in range(knees.shape[1]):
+        a = np.full(len(pairs), -1)
+        b = np.full(len(pairs), K)
+        while True:
+            open_ = np.flatnonzero(b - a > 1)
+            if not len(open_):
+                break
+            mid = (a[open_] + b[open_]) // 2
+            with np.errstate(divide='ignore'):
+                point = knees[open_, j] / sig_sorted[open_, mid]
+            below = point <= lo[open_]
+            evaluate = np.flatnonzero(~below & (point < hi[open_]))
+            if len(evaluate):
+                e = open_[evaluate]
+                below[evaluate] = _damage(point[evaluate], sig[e], cycles[e],
+                                          [x[e] for x in (knees, N_ref, sig_ref, p_inv)]) <= damage_limit
+            lo[open_] = np.where(below, np.maximum(lo[open_], point), lo[open_])
+            hi[open_] = np.where(below, hi[open_], np.minimum(hi[open_], point))
+            a[open_[below]] = mid[below]
+            b[open_[~below]] = mid[~below]
+
+    # segments are fixed on (lo, hi], ln D = ln sum(exp(c + p ln s)) is convex in ln s, Newton
+    # steps from hi approach the solution from above, one step is exact for a single slope
+    k = _segment_index(np.sqrt(lo * hi)[:, None] * sig, knees)
+    take = np.take_along_axis
+    p = take(p_inv, k, axis=1)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        c = np.log(cycles) - np.log(take(N_ref, k, axis=1)) + p * (np.log(sig) - np.log(take(sig_ref, k, axis=1)))
+    c = np.where(np.isnan(c), -np.inf, c)
+    log_limit = np.log(damage_limit)
+
+    u_lo, u_hi = np.log(lo), np.log(hi)
+    # the damage jumps above the limit right after lo, or at hi when a bin reaches a knee only
+    # by rounding of the stress at hi
+    jump_lo = _log_damage(c, p, u_lo)[0] > log_limit
+    jump_hi = ~jump_lo & ~(_log_damage(c, p, u_hi)[0] > log_limit)
+    result = np.where(jump_lo, lo, np.nextafter(hi, 0))
+    todo = np.flatnonzero(~jump_lo & ~jump_hi)
+    u = u_hi[todo]
+    for _ in range(max_iter):
+        if not len(todo):
+            break
+        log_D, slope = _log_damage(c[todo], p[todo], u)
+        step = (log_D - log_limit) / slope
+        u = np.clip(u - step, u_lo[todo], u_hi[todo])
+        done = np.abs(step) <= rtol
+        result[todo[done]] = np.exp(u[done])
+        todo, u = todo[~done], u[~done]
+    result[todo] = np.exp(u)
+
+    scale[pairs] = result
+    return scale
+
+
+def max_load_scale(materials: list, stress_F, stress_H, cycles, damage_limit: float = 1.,
+                   rtol: float = 1e-10, chunk_size: int = 2**16, max_iter: int = 100) -> SnDesign:
+    """
+    returns the largest factor on the stresses of load spectra that keeps the damage of every
+    material at or below damage_limit, see SnCurveIso6336.calc_damage
+
+    Materials passing a spectrum are np.flatnonzero(design.passes[g]), the material with the
+    least reserve among them is the one with the smallest design.scale[g].
+
+    Args:
+        materials (list): list of M SnCurveIso6336 objects
+        stress_F (np.ndarray): tooth root stress of every bin, bins along the last axis, leading
+                               axes are independent spectra (gears)
+        stress_H (np.ndarray): flank stress of every bin
+        cycles (np.ndarray): number of load cycles of every bin
+        damage_limit (float, optional): permissible damage. Defaults to 1.
+        rtol (float, optional): relative tolerance of the scale factors. Defaults to 1e-10.
+        chunk_size (int, optional): largest number of pairs of spectrum and curve per chunk,
+                                    chunks of long spectra are smaller, see module
+                                    documentation. Defaults to 2**16.
+        max_iter (int, optional): maximum number of iterations. Defaults to 100.
+
+    Returns:
+        SnDesign: scale factors of shape (..., M)
+    """
+
+    stress_F, stress_H, cycles = np.broadcast_arrays(*(np.asarray(x, dtype=float) for x in
+                                                       (stress_F, stress_H, cycles)))
+    shape = stress_F.shape[:-1]
+    spectra = [x.reshape(-1, x.shape[-1]) for x in (stress_F, stress_H, cycles)]
+    registry = SnCurveRegistry(materials)
+    _, foot, flank = registry.table.segments
+    curves = len(registry.curves)
+    G = len(spectra[0])
+
+    scales = np.empty((2, G * curves))
+    size = max(1, min(chunk_size, _DESIGN_ELEMENTS // spectra[0].shape[1]))
+    for start in range(0, G * curves, size):
+        # pairs of spectrum g and distinct curve m, m running fastest
+        pair = np.arange(start, min(start + size, G * curves))
+        g, m = np.divmod(pair, curves)
+        for side, (sig, segments) in enumerate(((spectra[0], foot), (spectra[1], flank))):
+            scales[side, pair] = _solve(
+                sig[g], spectra[2][g], [a[m] for a in segments[4:]], damage_limit, rtol, max_iter)
+
+    scale_F, scale_H = (x.reshape(G, curves)[:, registry.rows].reshape(shape + (len(materials),)) for x in scales)
+    scale = np.minimum(scale_F, scale_H)
+    return SnDesign(scale_F, scale_H, scale, scale >= 1)
+
+
+def max_torque_scale(materials: list, torque, cycles, torque_ref, sig_F_ref, sig_H_ref,
+                     damage_limit: float = 1., rtol: float = 1e-10, chunk_size: int = 2**16,
+                     max_iter: int = 100) -> SnDesign:
+    """
+    returns the largest factor on the torque of load spectra that keeps the damage of every
+    material at or below damage_limit, see max_load_scale and SnCurveIso6336.calc_damage_torque
+
+    The flank stress is proportional to the square root of the torque, the factor on the torque
+    of the flank is the square of the factor on its stress.
+
+    Args:
+        materials (list): list of M SnCurveIso6336 objects
+        torque (np.ndarray): torque of every bin, bins along the last axis
+        cycles (np.ndarray): number of load cycles of every bin
+        torque_ref, sig_F_ref, sig_H_ref (float or np.ndarray): reference torque and stresses of
+                                                                 foot and flank at reference
+                                                                 torque, per spectrum as arrays
+                                                                 of the shape of the leading axes
+        damage_limit, rtol, chunk_size, max_iter: see max_load_scale
+
+    Returns:
+        SnDesign: torque scale factors of shape (..., M)
+    """
+
+    load_ratio = np.asarray(torque, dtype=float) / np.asarray(torque_ref, dtype=float)[..., None]
+    design = max_load_scale(materials, np.asarray(sig_F_ref, dtype=float)[..., None] * load_ratio,
+                            np.asarray(sig_H_ref, dtype=float)[..., None] * np.sqrt(load_ratio), cycles,
+                            damage_limit, rtol, chunk_size, max_iter)
+    scale_H = design.scale_H**2
+    scale = np.minimum(design.scale_F, scale_H)
+    return SnDesign(design.scale_F, scale_H, scale, scale >= 1)
@@ -0,0 +1,229 @@
+"""
+Columnar export of materials and of evaluated S-N grids without pandas
+
+Both exports stream chunks of materials through SnCurveTable, so peak memory is one chunk. The
+format follows the file extension:
+
+    .csv       text, one row per material (grids: one row per material and side)
+    .npy       one memory-mappable array, structured for parameters, (2, M, K) for grids
+    .npz       uncompressed archive of one array per column
+    .parquet   needs pyarrow
+    .xlsx      parameters only, needs pandas and openpyxl, not streamed
+"""
+
+import csv
+import itertools
+import json
+import os
+import tempfile
+import zipfile
+
+import numpy as np
+
+from sn_curve_iso_6336 import _PARAMETERS, SnCurveTable
+from sn_instrument import stage, timed
+
+
+_SLOPES = ('p_F', 'p_H', 'p_H_lim_pit', 'p_F_red_life_fac', 'p_H_red_life_fac')
+
+# columns of the parameter table, same keys as SnCurveIso6336.to_dict
+PARAMETER_COLUMNS = ('name',) + _PARAMETERS + _SLOPES
+
+
+def _format(path: str, format: str = None) -> str:
+    '''returns the format of path, its extension if format is None'''
+    return (format or os.path.splitext(str(path))[1]).lstrip('.').lower()
+
+
+def _name_dtype(materials: list) -> np.dtype:
+    '''returns the unicode dtype holding the longest material name'''
+    return np.dtype(f'U{max([len(material.name) for material in materials], default=1)}')
+
+
+def _parameter_dtype(materials: list) -> np.dtype:
+    '''returns the structured dtype of the parameter table'''
+    return np.dtype([('name', _name_dtype(materials))] +
+                    [(name, bool if name in ('lim_pit_perm', 'red_life_fac') else float)
+                     for name in PARAMETER_COLUMNS[1:]])
+
+
+def _parameter_chunks(materials: list, chunk_size: int):
+    '''yields start row and the columns of the parameter table of every chunk of materials'''
+    for start in range(0, len(materials), chunk_size):
+        with stage('export.compute'):
+            table = SnCurveTable.from_curves(materials[start:start + chunk_size])
+            columns = {'name': np.array(table.names, dtype=str)}
+            columns.update((name, getattr(table, name)) for name in _PARAMETERS)
+            columns.update(zip(_SLOPES, table.slope))
+        yield start, columns
+
+
+def _grid_chunks(materials: list, load_cycles: np.ndarray, chunk_size: int):
+    '''yields start row, names and permissible stress of foot and flank of every chunk'''
+    for start in range(0, len(materials), chunk_size):
+        with stage('export.compute'):
+            table = SnCurveTable.from_curves(materials[start:start + chunk_size])
+            sig_perm_F, sig_perm_H = table.calc_sig_perm(load_cycles)
+        yield start, {'name': np.array(table.names, dtype=str), 'sig_perm_F': sig_perm_F,
+                      'sig_perm_H': sig_perm_H}
+
+
+def _write_npz(path: str, layout: dict, chunks):
+    '''
+    writes an uncompressed .npz archive chunk by chunk
+
+    Every member is filled as memory-mapped .npy file next to path and then copied into the
+    archive, so no member is held in memory.
+
+    Args:
+        layout (dict): dtype and shape of every member
+        chunks: iterable of start row and dict of rows of the members
+    '''
+
+    with tempfile.TemporaryDirectory(dir=os.path.dirname(os.path.abspath(path))) as directory:
+        files = {name: os.path.join(directory, name + '.npy') for name in layout}
+        members = {name: np.lib.format.open_memmap(files[name], mode='w+', dtype=dtype, shape=shape)
+                   for name, (dtype, shape) in layout.items()}
+        for start, columns in chunks:
+            for name, values in columns.items():
+                members[name][start:start + len(values)] = values
+        # closes the memory maps before the files are copied
+        while members:
+            members.popitem()[1].flush()
+        with zipfile.ZipFile(path, 'w', zipfile.ZIP_STORED, allowZip64=True) as archive:
+            for name, file in files.items():
+                archive.write(file, name + '.npy')
+
+
+def _parquet():
+    '''returns pyarrow and pyarrow.parquet, raises ImportError if pyarrow is not installed'''
+    try:
+        import pyarrow
+        import pyarrow.parquet
+    except ImportError as e:
+        raise ImportError('export to Parquet needs pyarrow') from e
+    return pyarrow, pyarrow.parquet
+
+
+@timed('export')
+def export_parameters(materials: list, path: str, chunk_size: int = 65536, format: str = None) -> str:
+    """
+    Exports the parameters and slopes of a list of materials, one row per material with the
+    columns PARAMETER_COLUMNS
+
+    Args:
+        materials (list): list of SnCurveIso6336 objects
+        path (str): output file
+        chunk_size (int, optional): number of materials per chunk. Defaults to 65536.
+        format (str, optional): 'csv', 'npy', 'npz', 'parquet' or 'xlsx'. Defaults to None, the
+                                extension of path.
+
+    Raises:
+        ValueError: if the format is not supported
+
+    Returns:
+        str: path
+    """
+
+    format = _format(path, format)
+    chunks = _parameter_chunks(materials, chunk_size)
+
+    if format == 'csv':
+        with open(path, 'w', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(PARAMETER_COLUMNS)
+            for _, columns in chunks:
+                writer.writerows(zip(*(values.tolist() for values in columns.values())))
+    elif format == 'npy':
+        table = np.lib.format.open_memmap(path, mode='w+', dtype=_parameter_dtype(materials),
+                                          shape=(len(materials),))
+        for start, columns in chunks:
+            rows = table[start:start + len(columns['name'])]
+            for name, values in columns.items():
+                rows[name] = values
+        table.flush()
+    elif format == 'npz':
+        dtype = _parameter_dtype(materials)
+        _write_npz(path, {name: (dtype[name], (len(materials),)) for name in PARAMETER_COLUMNS}, chunks)
+    elif format == 'parquet':
+        pa, pq = _parquet()
+        schema = pa.schema([(name, pa.string() if name == 'name' else pa.from_numpy_dtype(dtype))
+                            for name, (dtype, _) in _parameter_dtype(materials).fields.items()])
+        with pq.ParquetWriter(path, schema) as writer:
+            for _, columns in chunks:
+                writer.write_table(pa.table(columns, schema=schema))
+    elif format == 'xlsx':
+        import pandas as pd
+
+        pd.DataFrame(np.concatenate([np.rec.fromarrays(list(columns.values()), names=PARAMETER_COLUMNS)
+                                     for _, columns in chunks])).to_excel(path, index=False)
+    else:
+        raise ValueError(f'format {format} is not supported')
+    return path
+
+
+@timed('export')
+def export_grid(materials: list, load_cycles, path: str, chunk_size: int = 1024, format: str = None) -> str:
+    """
+    Exports the permissible stress of foot and flank of a list of materials at load_cycles
+
+    .npy holds one array of shape (2, M, K), foot and flank, readable as memory map with
+    numpy.load(path, mmap_mode='r'). .npz holds the arrays name, load_cycles, sig_perm_F and
+    sig_perm_H. .csv has one row per material and side ('F' or 'H') with one column per number of
+    load cycles. .parquet has the columns name, sig_perm_F and sig_perm_H (lists of K values),
+    the load cycles are stored in the metadata of the schema.
+
+    Args:
+        materials (list): list of SnCurveIso6336 objects
+        load_cycles (np.ndarray): K numbers of load cycles
+        path (str): output file
+        chunk_size (int, optional): number of materials per chunk. Defaults to 1024.
+        format (str, optional): 'csv', 'npy', 'npz' or 'parquet'. Defaults to None, the
+                                extension of path.
+
+    Raises:
+        ValueError: if the format is not supported
+
+    Returns:
+        str: path
+    """
+
+    format = _format(path, format)
+    load_cycles = np.asarray(load_cycles, dtype=float).reshape(-1)
+    chunks = _grid_chunks(materials, load_cycles, chunk_size)
+    shape = (len(materials), len(load_cycles))
+
+    if format == 'csv':
+        with open(path, 'w', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(['name', 'side'] + load_cycles.tolist())
+            for _, columns in chunks:
+                for name, foot, flank in zip(columns['name'].tolist(), columns['sig_perm_F'].tolist(),
+                                             columns['sig_perm_H'].tolist()):
+                    writer.writerow([name, 'F'] + foot)
+                    writer.writerow([name, 'H'] + flank)
+    elif format == 'npy':
+        grid = np.lib.format.open_memmap(path, mode='w+', dtype=float, shape=(2,) + shape)
+        for start, columns in chunks:
+            stop = start + len(columns['name'])
+            grid[0, start:stop] = columns['sig_perm_F']
+            grid[1, start:stop] = columns['sig_perm_H']
+        grid.flush()
+    elif format == 'npz':
+        layout = {'name': (_name_dtype(materials), shape[:1]), 'load_cycles': (float, shape[1:]),
+                  'sig_perm_F': (float, shape), 'sig_perm_H': (float, shape)}
+        _write_npz(path, layout, itertools.chain([(0, {'load_cycles': load_cycles})], chunks))
+    elif format == 'parquet':
+        pa, pq = _parquet()
+        values = pa.list_(pa.float64(), len(load_cycles))
+        schema = pa.schema([('name', pa.string()), ('sig_perm_F', values), ('sig_perm_H', values)],
+                           metadata={'load_cycles': json.dumps(load_cycles.tolist())})
+        with pq.ParquetWriter(path, schema) as writer:
+            for _, columns in chunks:
+                arrays = [pa.array(columns['name'].tolist(), pa.string())] + [
+                    pa.FixedSizeListArray.from_arrays(pa.array(columns[name].reshape(-1)), len(load_cycles))
+                    for name in ('sig_perm_F', 'sig_perm_H')]
+                writer.write_table(pa.Table.from_arrays(arrays, schema=schema))
+    else:
+        raise ValueError(f'format {format} is not supported')
+    return path
@@ -0,0 +1,281 @@
+"""
+Opt-in instrumentation of S-N curve evaluations and of the stages of export, plotting and batch
+evaluation
+
+    with SnStats() as stats:
+        write_dat_files(materials_COB)
+    stats.dump('stats.json')
+
+While a SnStats context is open, the evaluation methods of SnCurveIso6336 and SnCurveTable are
+wrapped to count evaluations per curve and per branch of the S-N curve, and the stages of the
+library report their wall time. Outside a context the methods are the plain ones and every stage
+costs one check of an empty list. Only the calling process is instrumented, work done by worker
+processes (processes > 1) is timed as a whole by the stage that waits for it.
+
+Branches: 'static' (at or above the static limit), 'finite' (finite life), 'limited_pitting'
+(flank with limited pitting), 'reduced_life' (reduced life factors after N_F_d and N_H_d),
+'endurance' (endurance limit).
+
+Stages: 'dat.compute', 'dat.io', 'export', 'export.compute', 'export.write', 'plot',
+'plot.render', 'batch', 'batch.parse', 'batch.evaluate'.
+"""
+
+import contextlib
+import functools
+import inspect
+import json
+import time
+
+import numpy as np
+
+
+# SnStats of the open contexts, innermost last
+_active = []
+
+_NULL = contextlib.nullcontext()
+
+# wrapped evaluations in progress, only the outermost one is counted
+_depth = 0
+
+# evaluation methods: operation and whether the inputs are stresses (inverse curve)
+_METHODS = {'calc_sig_perm': ('sig_perm', False), 'calc_sig_perm_array': ('sig_perm', False),
+            'calc_N_perm': ('N_perm', True), 'calc_damage': ('damage', True)}
+
+
+class _Stage:
+    '''times one stage for all open contexts'''
+
+    __slots__ = ('name', 'start')
+
+    def __init__(self, name: str):
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+
+    def __exit__(self, *exc_info):
+        seconds = time.perf_counter() - self.start
+        for stats in _active:
+            stats._add_time(self.name, seconds)
+
+
+def stage(name: str):
+    '''returns a context manager timing stage name, a no-op without open SnStats context'''
+    return _Stage(name) if _active else _NULL
+
+
+def timed(name: str):
+    '''decorator timing every call of a function as stage name, see stage'''
+    def decorator(function):
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            if not _active:
+                return function(*args, **kwargs)
+            with _Stage(name):
+                return function(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def _labels(side: str, inverse: bool, lim_pit_perm: bool, red_life_fac: bool) -> tuple:
+    '''returns the branch of every segment of a side of a S-N curve, see SnSegments'''
+    red = 'reduced_life' if red_life_fac else 'endurance'
+    knee = 'limited_pitting' if lim_pit_perm else 'finite'
+    if side == 'foot':
+        labels = ('static', 'finite', red, 'endurance')
+    else:
+        labels = ('static', 'finite', knee, red, 'endurance')
+    # the inverse segments run from the endurance limit up to the static limit
+    return labels[::-1] if inverse else labels
+
+
+def _segment_counts(x: np.ndarray, bounds: np.ndarray) -> np.ndarray:
+    '''returns the number of elements of x (any shape) per segment of the 1-d bounds'''
+    return np.bincount(np.ravel(np.searchsorted(bounds, x)), minlength=len(bounds) + 1)
+
+
+def _flag_segment_counts(x: np.ndarray, bounds: np.ndarray, flags: np.ndarray) -> np.ndarray:
+    '''
+    returns the number of elements of x per combination of flags and segment, shape (4, n), x of 
+    shape (1, K) or (M, K), bounds of shape (M, n-1) and flags 2 * lim_pit_perm + red_life_fac of 
+    shape (M,)
+    '''
+    n = bounds.shape[1] + 1
+    # number of bounds < x, see _take_segments, offset by the flags of the row
+    k = np.broadcast_to((flags * n)[:, None], (len(bounds), x.shape[1])).copy()
+    for j in range(n - 1):
+        k += x > bounds[:, j:j+1]
+    return np.bincount(k.ravel(), minlength=4 * n).reshape(4, n)
+
+
+class SnStats:
+    '''
+    Counters and stage timers of the evaluations inside a with block, see module documentation
+
+    Attributes:
+        evaluations (dict): curve name: {operation: number of evaluated values}, operations
+                            'sig_perm', 'N_perm', 'damage' and 'slope'. Tables without names
+                            (see SnCurveTable) count the total of all rows under
+                            repr(table).
+        branches (dict): 'foot' and 'flank': {branch: number of evaluated values}
+        stages (dict): stage: {'calls': number of calls, 'seconds': wall time}
+    '''
+
+    def __init__(self, callback=None):
+        """
+        Args:
+            callback (callable, optional): called as callback(stage, seconds) after every
+                                           timed stage. Defaults to None.
+        """
+
+        self.callback = callback
+        self.evaluations = {}
+        self.branches = {'foot': {}, 'flank': {}}
+        self.stages = {}
+
+    def __enter__(self) -> 'SnStats':
+        if not _active:
+            _install()
+        _active.append(self)
+        return self
+
+    def __exit__(self, *exc_info):
+        _active.remove(self)
+        if not _active:
+            _uninstall()
+
+    def _add_time(self, name: str, seconds: float):
+        entry = self.stages.setdefault(name, {'calls': 0, 'seconds': 0.})
+        entry['calls'] += 1
+        entry['seconds'] += seconds
+        if self.callback is not None:
+            self.callback(name, seconds)
+
+    def _count(self, name: str, operation: str, values: int):
+        counts = self.evaluations.setdefault(name, {})
+        counts[operation] = counts.get(operation, 0) + values
+
+    def _count_branches(self, side: str, labels: tuple, counts: np.ndarray):
+        branches = self.branches[side]
+        for label, count in zip(labels, counts.tolist()):
+            if count:
+                branches[label] = branches.get(label, 0) + count
+
+    def to_dict(self) -> dict:
+        '''returns evaluations, branches and stages as one JSON serializable dict'''
+        return {'evaluations': self.evaluations, 'branches': self.branches, 'stages': self.stages}
+
+    def dump(self, path: str):
+        '''writes to_dict as JSON to path'''
+        with open(path, 'w') as f:
+            json.dump(self.to_dict(), f, indent=1)
+
+
+def _record_curve(curve, operation: str, inverse: bool, args: tuple):
+    '''counts the evaluation of a SnCurveIso6336 method for all open contexts'''
+    coefficients = curve.coefficients
+    if operation == 'damage':
+        inputs = (np.asarray(args[0], dtype=float), np.asarray(args[1], dtype=float))
+        values = np.broadcast(*inputs, np.asarray(args[2])).size
+    else:
+        inputs = (np.asarray(args[0], dtype=float),) * 2
+        values = inputs[0].size
+    _count_curve(curve, operation, values)
+    for side, x, segments in (('foot', inputs[0], coefficients.foot), ('flank', inputs[1], coefficients.flank)):
+        counts = _segment_counts(x, segments.knees if inverse else segments.thresholds)
+        labels = _labels(side, inverse, curve.lim_pit_perm, curve.red_life_fac)
+        for stats in _active:
+            stats._count_branches(side, labels, counts)
+
+
+def _count_curve(curve, operation: str, values: int):
+    '''counts values evaluations of curve for all open contexts'''
+    for stats in _active:
+        stats._count(curve.name, operation, values)
+
+
+def _count_table(table, operation: str, values: int):
+    '''
+    counts values evaluations of every material of table for all open contexts, as one total 
+    of all materials under repr(table) for tables without names
+    '''
+    for stats in _active:
+        if isinstance(table.names, range):
+            stats._count(repr(table), operation, values * len(table))
+        else:
+            for name in table.names:
+                stats._count(name, operation, values)
+
+
+def _record_table(table, operation: str, inverse: bool, args: tuple):
+    '''counts the evaluation of a SnCurveTable method for all open contexts'''
+    if operation == 'sig_perm':
+        inputs = (np.atleast_2d(np.asarray(args[0], dtype=float)),) * 2
+    else:
+        stress_F = np.atleast_2d(np.asarray(args[0], dtype=float))
+        inputs = (stress_F, stress_F if args[1] is None else np.atleast_2d(np.asarray(args[1], dtype=float)))
+    _count_table(table, operation, max(x.shape[-1] for x in inputs))
+    flags = 2 * table.lim_pit_perm + table.red_life_fac
+    # segments of large tables are built per chunk of rows like in the evaluation
+    for rows, foot, flank in table._row_segments():
+        for side, x, segments in (('foot', inputs[0], foot), ('flank', inputs[1], flank)):
+            bounds = segments.knees if inverse else segments.thresholds
+            counts = _flag_segment_counts(x[rows] if len(x) > 1 else x, bounds, flags[rows])
+            for flag in np.flatnonzero(counts.any(axis=1)):
+                labels = _labels(side, inverse, flag >= 2, flag % 2 == 1)
+                for stats in _active:
+                    stats._count_branches(side, labels, counts[flag])
+
+
+def _counted(method, record, operation: str, inverse: bool):
+    '''returns method counting its outermost calls with record'''
+    signature = inspect.signature(method)
+
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        global _depth
+        if _depth:
+            return method(self, *args, **kwargs)
+        _depth += 1
+        try:
+            result = method(self, *args, **kwargs)
+        finally:
+            _depth -= 1
+        arguments = signature.bind(self, *args, **kwargs)
+        arguments.apply_defaults()
+        record(self, operation, inverse, tuple(arguments.arguments.values())[1:])
+        return result
+    return wrapper
+
+
+def _counted_slope(prop, count):
+    '''returns property prop counting one slope evaluation per curve with count'''
+    def getter(self):
+        count(self, 'slope', 1)
+        return prop.fget(self)
+    return property(getter, doc=prop.__doc__)
+
+
+# original attributes of the wrapped classes while instrumented
+_originals = []
+
+
+def _install():
+    '''wraps the evaluation methods of SnCurveIso6336 and SnCurveTable'''
+    from sn_curve_iso_6336 import SnCurveIso6336, SnCurveTable
+
+    for cls, record in ((SnCurveIso6336, _record_curve), (SnCurveTable, _record_table)):
+        for name, (operation, inverse) in _METHODS.items():
+            if name in cls.__dict__:
+                _originals.append((cls, name, cls.__dict__[name]))
+                setattr(cls, name, _counted(cls.__dict__[name], record, operation, inverse))
+        _originals.append((cls, 'slope', cls.__dict__['slope']))
+    SnCurveIso6336.slope = _counted_slope(SnCurveIso6336.__dict__['slope'], _count_curve)
+    SnCurveTable.slope = _counted_slope(SnCurveTable.__dict__['slope'], _count_table)
+
+
+def _uninstall():
+    '''restores the evaluation methods'''
+    while _originals:
+        cls, name, attribute = _originals.pop()
+        setattr(cls, name, attribute)
@@ -0,0 +1,238 @@
+import math
+
+import numpy as np
+
+from sn_curve_iso_6336 import SnCurveIso6336
+
+
+# rows of the table: log10 of the permissible stress of foot and flank over log10(N), log10 of
+# the permissible number of load cycles of foot and flank over log10(stress)
+_SIG_F, _SIG_H, _N_F, _N_H = range(4)
+
+
+def _interpolate(x: np.ndarray, x0: float, x1: float, values: np.ndarray) -> np.ndarray:
+    '''
+    linear interpolation of values on the uniform grid from x0 to x1, clamped at both ends, NaN 
+    gives NaN
+    '''
+    n = len(values)
+    t = np.clip((x - x0) * ((n - 1) / (x1 - x0)), 0, n - 1)
+    # fmin and fmax map NaN onto a valid index, t - i keeps it NaN
+    i = np.fmax(np.fmin(t, n - 2), 0).astype(np.intp)
+    return values[i] + (t - i) * (values[i + 1] - values[i])
+
+
+class SnLookupTable:
+    '''
+    S-N curves of foot and flank of one material sampled on uniform grids in log-log space
+
+    The permissible stress is tabulated over log10(N) from 10^0 to 10^10, the permissible number
+    of load cycles over log10(stress) from the lowest endurance limit to the static limit.
+    Evaluation is index arithmetic plus linear interpolation, which is exact on every power law
+    segment, so the error is largest at the knees. Outside the grids the values are clamped like
+    SnCurveIso6336.calc_sig_perm and calc_N_perm.
+
+    The table is one array of shape (4, n + 2), the first two columns hold the grid ends. It can be
+    saved to a .npy file and loaded as memory map, so processes share one copy.
+    '''
+
+    __slots__ = ('data', '_lists')
+
+    def __init__(self, data: np.ndarray):
+        """
+        Args:
+            data (np.ndarray): table of shape (4, n + 2), see from_curve
+        """
+
+        self.data = data
+        self._lists = None
+
+    @classmethod
+    def from_curve(cls, curve: SnCurveIso6336, max_rel_error: float = 1e-4, points_per_decade: int = 16,
+                   max_points: int = 2**24) -> 'SnLookupTable':
+        """
+        Samples a S-N curve, the grids are refined until the relative error of the permissible
+        stress and of the permissible number of load cycles is at most max_rel_error
+
+        Args:
+            curve (SnCurveIso6336): S-N curve
+            max_rel_error (float, optional): maximum relative error. Defaults to 1e-4.
+            points_per_decade (int, optional): initial grid points per decade of load cycles.
+                                               Defaults to 16.
+            max_points (int, optional): largest number of grid points. Defaults to 2**24.
+
+        Raises:
+            ValueError: if max_rel_error is not reached with max_points
+
+        Returns:
+            SnLookupTable: table of curve
+        """
+
+        n = 10 * points_per_decade + 1
+        while n <= max_points:
+            table = cls._sample(curve, n)
+            if table.validate(curve) <= max_rel_error:
+                return table
+            n = 2 * n - 1
+        raise ValueError(f'{max_rel_error} not reached with {max_points} points for {curve.name}')
+
+    @classmethod
+    def _sample(cls, curve: SnCurveIso6336, n: int) -> 'SnLookupTable':
+        '''samples curve on grids of n points'''
+        foot, flank = curve.coefficients.foot, curve.coefficients.flank
+        data = np.empty((4, n + 2))
+        data[:2, :2] = 0., 10.
+        data[_N_F, :2] = np.log10(foot.knees[[0, -1]])
+        data[_N_H, :2] = np.log10(flank.knees[[0, -1]])
+
+        u = np.linspace(0., 10., n)
+        data[_SIG_F, 2:], data[_SIG_H, 2:] = np.log10(curve.calc_sig_perm_array(10**u))
+        for row, segments, side in ((_N_F, foot, 0), (_N_H, flank, 1)):
+            sig = 10**np.linspace(*data[row, :2], n)
+            # the lower end is the limit from above, at the endurance limit the life is infinite
+            sig[0] = np.nextafter(segments.knees[0], np.inf)
+            sig[-1] = segments.knees[-1]
+            data[row, 2:] = np.log10(curve.calc_N_perm(sig)[side])
+        return cls(data)
+
+    @classmethod
+    def load(cls, path: str, mmap_mode: str = 'r') -> 'SnLookupTable':
+        """
+        Args:
+            path (str): .npy file written by save
+            mmap_mode (str, optional): see numpy.load. Defaults to 'r', a read-only memory map.
+        """
+        return cls(np.load(path, mmap_mode=mmap_mode))
+
+    def save(self, path: str):
+        '''writes the table to the .npy file path'''
+        np.save(path, self.data)
+
+    def __len__(self) -> int:
+        """returns the number of grid points"""
+        return self.data.shape[1] - 2
+
+    def __repr__(self):
+        return f'SnLookupTable({len(self)} points)'
+
+    def sig_perm(self, load_cycles) -> tuple:
+        """
+        returns permissible stress for foot and flank, see SnCurveIso6336.calc_sig_perm_array
+
+        Args:
+            load_cycles (np.ndarray): Numbers of stress cycles, any shape
+
+        Returns:
+            Tuple[np.ndarray, np.ndarray]: perm stress foot, perm stress flank
+        """
+
+        data = self.data
+        with np.errstate(divide='ignore'):
+            u = np.log10(np.asarray(load_cycles, dtype=float))
+        return tuple(10**_interpolate(u, data[row, 0], data[row, 1], data[row, 2:]) for row in (_SIG_F, _SIG_H))
+
+    def N_perm(self, stress_F, stress_H=None) -> tuple:
+        """
+        returns permissible number of load cycles for foot and flank, see
+        SnCurveIso6336.calc_N_perm
+
+        Args:
+            stress_F (np.ndarray): tooth root stress, any shape
+            stress_H (np.ndarray, optional): flank stress. Defaults to None, stress_F is used for
+                                             the flank as well.
+
+        Returns:
+            Tuple[np.ndarray, np.ndarray]: perm load cycles foot, perm load cycles flank
+        """
+
+        data = self.data
+        N_perm = []
+        for row, stress in ((_N_F, stress_F), (_N_H, stress_F if stress_H is None else stress_H)):
+            with np.errstate(divide='ignore'):
+                v = np.log10(np.asarray(stress, dtype=float))
+            x0, x1 = data[row, :2]
+            N = 10**_interpolate(v, x0, x1, data[row, 2:])
+            N_perm.append(np.where(v <= x0, np.inf, np.where(v > x1, 0., N)))
+        return tuple(N_perm)
+
+    def _rows(self) -> list:
+        '''returns the rows as (x0, x1, list of values), Python floats are faster for single values'''
+        if self._lists is None:
+            self._lists = [(float(row[0]), float(row[1]), row[2:].tolist()) for row in self.data]
+        return self._lists
+
+    def _scalar(self, row: int, x: float) -> float:
+        '''interpolates row at x with Python floats, see _interpolate'''
+        x0, x1, values = self._rows()[row]
+        n = len(values)
+        t = (x - x0) * ((n - 1) / (x1 - x0))
+        if t <= 0.:
+            return values[0]
+        if t >= n - 1:
+            return values[-1]
+        i = int(t)
+        return values[i] + (t - i) * (values[i + 1] - values[i])
+
+    def __call__(self, load_cycles: float) -> tuple:
+        """
+        returns permissible stress for foot and flank of one number of load cycles, faster than
+        sig_perm for single values
+
+        Returns:
+            tuple[float]: perm stress foot, perm stress flank
+        """
+
+        if load_cycles != load_cycles:
+            return math.nan, math.nan
+        u = math.log10(load_cycles) if load_cycles > 0 else -math.inf
+        return 10**self._scalar(_SIG_F, u), 10**self._scalar(_SIG_H, u)
+
+    def damage_increment(self, stress_F: float, stress_H: float) -> tuple:
+        """
+        returns the damage of one load cycle for foot and flank according to Palmgren-Miner,
+        1 / N_perm, for single values
+
+        Returns:
+            tuple[float]: damage foot, damage flank
+        """
+
+        damage = []
+        for row, stress in ((_N_F, stress_F), (_N_H, stress_H)):
+            if stress != stress:
+                damage.append(math.nan)
+                continue
+            v = math.log10(stress) if stress > 0 else -math.inf
+            x0, x1, _ = self._rows()[row]
+            if v <= x0:
+                damage.append(0.)
+            elif v > x1:
+                damage.append(math.inf)
+            else:
+                damage.append(10**-self._scalar(row, v))
+        return tuple(damage)
+
+    def validate(self, curve: SnCurveIso6336) -> float:
+        """
+        returns the largest relative error of the table against the exact curve, evaluated at
+        all knees and at the midpoints of all grid cells
+
+        Args:
+            curve (SnCurveIso6336): S-N curve the table was sampled from
+        """
+
+        data = self.data
+        foot, flank = curve.coefficients.foot, curve.coefficients.flank
+        error = 0.
+        with np.errstate(divide='ignore', invalid='ignore'):
+            u = np.linspace(data[_SIG_F, 0], data[_SIG_F, 1], len(self))
+            N = 10**np.concatenate([(u[1:] + u[:-1]) / 2, np.log10(foot.thresholds[:-1]),
+                                    np.log10(flank.thresholds[:-1])])
+            for exact, approx in zip(curve.calc_sig_perm_array(N), self.sig_perm(N)):
+                error = max(error, np.max(np.abs(approx / exact - 1)))
+
+            for row, segments, side in ((_N_F, foot, 0), (_N_H, flank, 1)):
+                v = np.linspace(data[row, 0], data[row, 1], len(self))
+                sig = np.concatenate([10**((v[1:] + v[:-1]) / 2), segments.knees[1:-1]])
+                exact, approx = curve.calc_N_perm(sig)[side], self.N_perm(sig)[side]
+                error = max(error, np.max(np.abs(approx / exact - 1)))
+        return float(error)
@@ -0,0 +1,190 @@
+import numpy as np
+from typing import NamedTuple
+
+from sn_curve_iso_6336 import SnCurveIso6336, SnDamage
+
+
+class RainflowHistogram(NamedTuple):
+    '''
+    Rainflow cycles binned by peak, the larger absolute value of the two reversals of a cycle
+
+    The load level of a bin is its upper edge, the load level of the last bin is raised to the
+    largest counted peak, so peaks above the last edge are never underestimated.
+    '''
+
+    edges: np.ndarray
+    counts: np.ndarray
+    max_peak: float
+
+    @property
+    def levels(self) -> np.ndarray:
+        '''load level of every bin'''
+        levels = self.edges[1:].copy()
+        levels[-1] = max(levels[-1], self.max_peak)
+        return levels
+
+    def damage(self, curve: SnCurveIso6336, torque_ref: float, sig_F_ref: float,
+               sig_H_ref: float) -> SnDamage:
+        '''
+        returns damage for foot and flank of a torque histogram, see
+        SnCurveIso6336.calc_damage_torque
+
+        The peak of a cycle is used as torque, i.e. a cycle of a signal with a mean load is 
+        evaluated at its maximum torque and not at its range. Both directions of the torque are 
+        evaluated with the same S-N curve.
+        '''
+        return curve.calc_damage_torque(self.levels, self.counts, torque_ref, sig_F_ref, sig_H_ref)
+
+
+def _closed_cycles_stack(reversals: np.ndarray):
+    '''
+    four-point rainflow counting with a stack, one reversal at a time
+
+    Returns:
+        tuple: residue (np.ndarray), peaks of closed cycles (np.ndarray)
+    '''
+    stack = []
+    peaks = []
+    for x in reversals.tolist():
+        stack.append(x)
+        while len(stack) >= 4:
+            inner = abs(stack[-2] - stack[-3])
+            if inner <= abs(stack[-3] - stack[-4]) and inner <= abs(stack[-1] - stack[-2]):
+                peaks.append(max(abs(stack[-2]), abs(stack[-3])))
+                del stack[-3:-1]
+            else:
+                break
+    return np.array(stack), np.array(peaks)
+
+
+def _closed_cycles(reversals: np.ndarray, min_removed: int = 1024):
+    '''
+    four-point rainflow counting, removes all closed cycles from a sequence of reversals
+
+    Every closed cycle (a range enclosed by both neighbouring ranges) is removed in vectorized
+    passes. Removing a cycle never opens another one, so the result does not depend on the order
+    of removal. Once a pass removes fewer than min_removed cycles, the rest is counted with a
+    stack, which gives the same result in one pass.
+
+    Returns:
+        tuple: residue (np.ndarray), peaks of closed cycles (np.ndarray)
+    '''
+    r = reversals
+    peaks = []
+    while len(r) >= 4:
+        d = np.abs(np.diff(r))
+        closed = np.flatnonzero((d[1:-1] <= d[:-2]) & (d[1:-1] <= d[2:]))
+        if len(closed) < min_removed:
+            r, stack_peaks = _closed_cycles_stack(r)
+            peaks.append(stack_peaks)
+            break
+        # neighbouring cycles share a reversal, of each run of neighbours every other one is removed
+        run_start = np.maximum.accumulate(np.where(np.diff(closed, prepend=-2) > 1, closed, 0))
+        closed = closed[(closed - run_start) % 2 == 0]
+        peaks.append(np.maximum(np.abs(r[closed + 1]), np.abs(r[closed + 2])))
+        keep = np.ones(len(r), dtype=bool)
+        keep[closed + 1] = False
+        keep[closed + 2] = False
+        r = r[keep]
+    peaks = np.concatenate(peaks) if peaks else np.empty(0)
+    return r, peaks
+
+
+class RainflowCounter:
+    '''
+    Streaming rainflow counter with a fixed histogram of the cycle peaks, see RainflowHistogram
+
+    Chunks of a time series are fed in order with update. The reversals that do not belong to a
+    closed cycle yet (residue) and the last sample are carried over to the next chunk, so the
+    result does not depend on the chunk size. Memory is bounded by the chunk, the residue and the
+    histogram.
+    '''
+
+    def __init__(self, edges):
+        '''
+        Args:
+            edges (array): ascending bin edges of the cycle peaks, peaks below the first edge
+                           are ignored, peaks above the last edge are counted in the last bin
+        '''
+        self.edges = np.asarray(edges, dtype=float)
+        self.counts = np.zeros(len(self.edges) - 1)
+        self.max_peak = 0.
+        self._residue = np.empty(0)
+        self._last = None
+        self._direction = 0.
+
+    def _add(self, peaks: np.ndarray, weight: float):
+        '''adds cycles with their peaks to the histogram'''
+        if len(peaks) == 0:
+            return
+        self.max_peak = max(self.max_peak, float(peaks.max()))
+        peaks = peaks[peaks >= self.edges[0]]
+        index = np.minimum(np.searchsorted(self.edges, peaks, side='right') - 1, len(self.counts) - 1)
+        self.counts += weight * np.bincount(index, minlength=len(self.counts))
+
+    def update(self, chunk):
+        '''
+        counts the closed cycles of the next chunk of the time series
+
+        Args:
+            chunk (array): next samples of the time series
+        '''
+        x = np.asarray(chunk, dtype=float).reshape(-1)
+        if self._last is not None:
+            x = np.concatenate(([self._last], x))
+        if len(x) == 0:
+            return
+        # constant parts are no reversals
+        x = x[np.concatenate(([True], np.diff(x) != 0))]
+        if self._last is None:
+            # first sample of the time series starts the residue
+            self._residue = x[:1]
+        direction = np.sign(np.diff(x))
+        if len(direction) > 0:
+            # x[0] is the last sample of the previous chunk, x[-1] is not known to be a reversal yet
+            turns = np.concatenate(([self._direction != 0 and direction[0] != self._direction],
+                                    direction[1:] != direction[:-1], [False]))
+            self._residue, peaks = _closed_cycles(np.concatenate((self._residue, x[turns])))
+            self._add(peaks, 1.)
+            self._direction = direction[-1]
+        self._last = x[-1]
+
+    def histogram(self) -> RainflowHistogram:
+        '''
+        returns the histogram of all cycles counted so far, the residue and the last sample are
+        counted as half cycles. The counter is not changed and can be updated further.
+        '''
+        counter = RainflowCounter(self.edges)
+        counter.counts = self.counts.copy()
+        counter.max_peak = self.max_peak
+        if self._last is not None:
+            residue = self._residue if self._direction == 0 else np.append(self._residue, self._last)
+            residue, peaks = _closed_cycles(residue)
+            counter._add(peaks, 1.)
+            counter._add(np.maximum(np.abs(residue[:-1]), np.abs(residue[1:])), 0.5)
+        return RainflowHistogram(self.edges, counter.counts, counter.max_peak)
+
+
+def rainflow_file(path: str, edges, chunk_size: int = 2**22, dtype: str = 'float32') -> RainflowHistogram:
+    '''
+    rainflow counting of a time series file through a memory map, chunk by chunk
+
+    Args:
+        path (str): .npy file or raw binary file of samples
+        edges (array): bin edges of the cycle peaks, see RainflowCounter
+        chunk_size (int, optional): number of samples per chunk. Defaults to 2**22.
+        dtype (str, optional): sample type of raw binary files. Defaults to 'float32'.
+
+    Returns:
+        RainflowHistogram: histogram of all cycles
+    '''
+    if str(path).endswith('.npy'):
+        samples = np.load(path, mmap_mode='r')
+    else:
+        samples = np.memmap(path, dtype=dtype, mode='r')
+    samples = samples.reshape(-1)
+
+    counter = RainflowCounter(edges)
+    for start in range(0, len(samples), chunk_size):
+        counter.update(samples[start:start + chunk_size])
+    return counter.histogram()
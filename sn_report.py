@@ -0,0 +1,137 @@
+import math
+
+import numpy as np
+
+from sn_curve_iso_6336 import SnCurveIso6336
+from sn_instrument import stage, timed
+
+
+def _foot_points(material: SnCurveIso6336):
+    '''returns load cycles and permissible stress of the knee points of the foot S-N curve'''
+    sig_FE_red_life_fac = material.sig_FE if material.red_life_fac == 0 else 0.85 * material.sig_FE
+    N = [1, material.N_F_stat, material.N_F_d, 1e10]
+    stress = [material.sig_FP_stat, material.sig_FP_stat, material.sig_FE, sig_FE_red_life_fac]
+    return N, stress
+
+
+def _flank_points(material: SnCurveIso6336):
+    '''returns load cycles and permissible stress of the knee points of the flank S-N curve'''
+    N_lim_perm = material.N_H_stat if material.lim_pit_perm == 0 else 1e7
+    sig_H_lim_perm = material.sig_HP_stat if material.lim_pit_perm == 0 else 0.5*(material.sig_H_lim+material.sig_HP_stat)
+    sig_H_lim_red_life_fac = material.sig_H_lim if material.red_life_fac == 0 else 0.85 * material.sig_H_lim
+    N = [1, material.N_H_stat, N_lim_perm, material.N_H_d, 1e10]
+    stress = [material.sig_HP_stat, material.sig_HP_stat, sig_H_lim_perm, material.sig_H_lim, sig_H_lim_red_life_fac]
+    return N, stress
+
+
+def _format_axes(ax, values: list, x_min: float, ylabel: str, title: str):
+    '''log-log axes with stress ticks and grid like plot_SN_curve'''
+    from matplotlib.ticker import MultipleLocator, NullFormatter, ScalarFormatter
+
+    min_value = math.floor(min(values)/100.)*100
+    max_value = math.ceil(max(values)/100.)*100
+
+    ax.set_xscale('log')
+    ax.set_yscale('log')
+    ax.set_xlim(x_min, 1e10)
+    ax.set_ylim(min_value-100, max_value+100)
+    ax.set_xlabel('Number of load cycles')
+    ax.set_ylabel(ylabel)
+    ax.set_title(title)
+    ax.yaxis.set_major_formatter(ScalarFormatter())
+    # minor ticks only carry grid lines, formatting their hidden labels dominates rendering time
+    ax.yaxis.set_minor_formatter(NullFormatter())
+    ax.yaxis.set_major_locator(MultipleLocator(200))
+    ax.grid(True, which='major', linewidth=0.5)
+    ax.grid(True, which='minor', linestyle='--', linewidth=0.3)
+
+
+@timed('plot')
+def _overview_figure(materials: list, side: str):
+    '''
+    returns the overview figure of all materials for side 'foot' or 'flank', all curves are drawn
+    as one line collection
+    '''
+    from matplotlib.collections import LineCollection
+    from matplotlib.figure import Figure
+    from matplotlib.lines import Line2D
+
+    points = _foot_points if side == 'foot' else _flank_points
+    segments = [np.column_stack(points(material)) for material in materials]
+    colors = [f'C{i % 10}' for i in range(len(materials))]
+
+    fig = Figure(figsize=(11.69, 8.27))
+    ax = fig.add_subplot()
+    ax.add_collection(LineCollection(segments, colors=colors, linewidths=1.))
+    values = sorted(set(np.concatenate([segment[:, 1] for segment in segments]).tolist()))
+    if side == 'foot':
+        _format_axes(ax, values, 1e3, 'Permissable bending stress in MPa', 'S-N curve root')
+    else:
+        _format_axes(ax, values, 1e4, 'Permissable contact stress in MPa', 'S-N curve flank')
+    # a legend is only readable for small families
+    if len(materials) <= 30:
+        handles = [Line2D([], [], color=color) for color in colors]
+        ax.legend(handles, [material.name for material in materials], prop={'size': 4})
+    return fig
+
+
+@timed('plot')
+def _material_figure(material: SnCurveIso6336):
+    '''returns the sheet of one material with the S-N curves of foot and flank'''
+    from matplotlib.figure import Figure
+    from matplotlib.ticker import NullFormatter
+
+    fig = Figure(figsize=(11.69, 8.27))
+    ax = fig.add_subplot()
+    N_F, stress_F = _foot_points(material)
+    N_H, stress_H = _flank_points(material)
+    ax.plot(N_F, stress_F, '-', label='foot')
+    ax.plot(N_H, stress_H, '-', label='flank')
+    _format_axes(ax, stress_F + stress_H, material.N_F_stat/10, 'Permissable stress in MPa',
+                 'S-N curves for foot and flank of ' + material.name)
+    ax.legend()
+
+    # knee values on the right axis
+    ax2 = ax.twinx()
+    ax2.set_yscale('log')
+    ax2.set_ylim(ax.get_ylim())
+    ax2.set_yticks(sorted(set(stress_F + stress_H)))
+    ax2.set_yticklabels([f'{value:g}' for value in sorted(set(stress_F + stress_H))])
+    ax2.yaxis.set_minor_formatter(NullFormatter())
+    return fig
+
+
+def _render_pages(materials: list, path: str, overview: list = None) -> str:
+    '''writes the overview pages of the materials in overview and one page per material to path'''
+    from matplotlib.backends.backend_pdf import PdfPages
+
+    with PdfPages(path) as pdf:
+        if overview:
+            for side in ('foot', 'flank'):
+                figure = _overview_figure(overview, side)
+                with stage('plot.render'):
+                    pdf.savefig(figure)
+        for material in materials:
+            # figures are not registered with pyplot and are freed after saving
+            figure = _material_figure(material)
+            with stage('plot.render'):
+                pdf.savefig(figure)
+    return path
+
+
+def render_report(materials: list, path: str = 'sn_curves.pdf') -> str:
+    """
+    Renders a multi-page PDF report of a list of materials without a display
+
+    The first two pages show the S-N curves of foot and flank of all materials, followed by one
+    page per material. Pages are rendered one at a time, every figure is freed after saving.
+
+    Args:
+        materials (list): list of SnCurveIso6336 objects
+        path (str, optional): path of the PDF file. Defaults to 'sn_curves.pdf'.
+
+    Returns:
+        str: path of the written PDF file
+    """
+
+    return _render_pages(materials, path, materials)
@@ -0,0 +1,39 @@
+import json
+
+from sn_benchmark import compare, main, run
+
+
+def _result(import_time, times):
+    return {'meta': {}, 'import': import_time, 'results': times}
+
+
+def test_compare_flags_regressions_beyond_threshold():
+    baseline = _result(0.1, {'calc_sig_perm_array': {'1': 1e-6, '1000': 1.0, '10000': 2.0},
+                             'export_data': 'skipped: No module named openpyxl'})
+    current = _result(0.11, {'calc_sig_perm_array': {'1': 5e-5, '1000': 1.3, '10000': 2.1},
+                             'export_data': {'1': 1.0}, 'new_case': {'1': 1.0}})
+
+    # noisy tiny times, skipped and new cases are never regressions
+    assert compare(baseline, current, threshold=0.2) == [('calc_sig_perm_array', '1000', 1.0, 1.3)]
+    assert compare(baseline, current, threshold=0.05) == [('import', '', 0.1, 0.11),
+                                                         ('calc_sig_perm_array', '1000', 1.0, 1.3)]
+
+
+def test_run_and_compare_against_baseline(tmp_path):
+    result = run(max_size=10, repeat=1, cases=['calc_sig_perm', 'calc_sig_perm_array', 'write_dat_files'])
+
+    assert set(result['results']['calc_sig_perm']) == {'1', '10'}
+    assert result['import'] > 0
+
+    baseline = tmp_path / 'baseline.json'
+    with open(baseline, 'w') as f:
+        json.dump(_result(1e9, {name: {size: 1e9 for size in times}
+                                for name, times in result['results'].items()}), f)
+    output = str(tmp_path / 'current.json')
+    assert main(['--max-size', '10', '--repeat', '1', '--cases', 'calc_sig_perm_array',
+                 '--output', output, '--compare', str(baseline)]) == 0
+
+    with open(baseline, 'w') as f:
+        json.dump(_result(0., {'calc_sig_perm_array': {'1': 1e-9, '10': 1e-9}}), f)
+    assert main(['--max-size', '10', '--repeat', '1', '--cases', 'calc_sig_perm_array',
+                 '--output', output, '--compare', str(baseline), '--threshold', '-1']) == 1
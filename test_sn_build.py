@@ -0,0 +1,50 @@
+import copy
+import os
+
+from sn_build import build
+from sn_curve_iso_6336 import materials_COB
+
+
+def test_build_rebuilds_changed_artefacts(tmp_path):
+    materials = copy.deepcopy(materials_COB[:4])
+    directory = str(tmp_path)
+
+    first = build(materials, directory, kinds=('dat', 'sheet', 'parameters'))
+    assert len(first.built) == 9 and first.skipped == []
+    assert all(os.path.exists(path) for path in first.built)
+
+    second = build(materials, directory, kinds=('dat', 'sheet', 'parameters'), processes=2)
+    assert second.built == [] and len(second.skipped) == 9
+
+    materials[1].sig_FE = 900
+    os.remove(tmp_path / ('WL_' + materials[2].name + '.dat'))
+    third = build(materials, directory, kinds=('dat', 'sheet', 'parameters'), processes=2)
+    assert sorted(os.path.basename(path) for path in third.built) == sorted(
+        ['WL_' + materials[1].name + '.dat', 'WL_' + materials[2].name + '.dat',
+         'SN_' + materials[1].name + '.pdf', 'parameters.csv'])
+
+
+def test_build_prunes_stale_artefacts(tmp_path):
+    materials = materials_COB[:3]
+    directory = str(tmp_path)
+    build(materials, directory, kinds=('dat',))
+
+    kept = build(materials[:2], directory, kinds=('dat',))
+    assert kept.removed == [] and os.path.exists(tmp_path / ('WL_' + materials[2].name + '.dat'))
+
+    pruned = build(materials[:2], directory, kinds=('dat',), prune=True)
+    assert pruned.removed == [os.path.join(directory, 'WL_' + materials[2].name + '.dat')]
+    assert not os.path.exists(pruned.removed[0])
+    assert build(materials[:2], directory, kinds=('dat',), force=True).skipped == []
+
+
+def test_build_prunes_only_requested_kinds(tmp_path):
+    materials = materials_COB[:3]
+    directory = str(tmp_path)
+    build(materials, directory, kinds=('dat', 'parameters'))
+
+    pruned = build(materials[:2], directory, kinds=('dat',), prune=True)
+
+    assert pruned.removed == [os.path.join(directory, 'WL_' + materials[2].name + '.dat')]
+    assert os.path.exists(tmp_path / 'parameters.csv')
+    assert build(materials, directory, kinds=('parameters',)).built == []
@@ -0,0 +1,65 @@
+import io
+import json
+
+import numpy as np
+
+from sn_cli import evaluate_batch, main, run
+from sn_curve_iso_6336 import materials_COB
+
+
+def _requests():
+    at_01, at_04 = materials_COB[0], materials_COB[3]
+    parameters = {name: getattr(at_01, name) for name in ('N_F_stat', 'N_F_d', 'sig_FP_stat', 'sig_FE',
+                                                          'N_H_stat', 'N_H_d', 'sig_HP_stat', 'sig_H_lim')}
+    return [
+        {'id': 0, 'op': 'sig_perm', 'material': at_01.name, 'cycles': [1e3, 1e5, 1e7]},
+        {'id': 1, 'material': at_04.name, 'cycles': 2e6},
+        {'id': 2, 'op': 'sig_perm', 'material': dict(parameters, name='inline'), 'cycles': [5e5]},
+        {'id': 3, 'op': 'N_perm', 'material': at_04.name, 'stress': [3000, 2000, 1500, 1000]},
+        {'id': 4, 'op': 'damage', 'material': at_01.name, 'stress_F': [1200, 1500],
+         'stress_H': [1600, 1700], 'cycles': [1e5, 1e4]},
+        {'id': 5, 'op': 'damage', 'material': at_01.name, 'torque': [1000, 1100], 'cycles': 1e6,
+         'torque_ref': 1000, 'sig_F_ref': 1200, 'sig_H_ref': 1700},
+        {'id': 6, 'op': 'sig_perm', 'material': 'unknown', 'cycles': [1e6]},
+        {'id': 7, 'op': 'fatigue', 'material': at_01.name},
+        {'id': 8, 'op': 'damage', 'material': at_01.name, 'stress_F': [1200]},
+    ]
+
+
+def test_evaluate_batch():
+    at_01, at_04 = materials_COB[0], materials_COB[3]
+    lines = [json.dumps(request) for request in _requests()] + ['{not json']
+
+    results = [json.loads(line) for line in evaluate_batch(lines).splitlines()]
+
+    assert [result['id'] for result in results] == list(range(9)) + [None]
+    np.testing.assert_array_equal(results[0]['sig_perm_F'], at_01.calc_sig_perm_array([1e3, 1e5, 1e7])[0])
+    assert results[1]['sig_perm_H'] == [at_04.calc_sig_perm(2e6)[1]]
+    assert results[2]['sig_perm_F'] == [at_01.calc_sig_perm(5e5)[0]]
+    np.testing.assert_array_equal(results[3]['N_perm_F'], at_04.calc_N_perm(np.array([3000., 2000, 1500, 1000]))[0])
+    assert results[3]['N_perm_F'][-1] == float('inf')
+
+    damage = at_01.calc_damage([1200, 1500], [1600, 1700], [1e5, 1e4])
+    np.testing.assert_array_equal(results[4]['per_bin_H'], damage.per_bin_H)
+    assert results[4]['total_F'] == damage.total_F
+    torque = at_01.calc_damage_torque([1000, 1100], 1e6, 1000, 1200, 1700)
+    assert results[5]['total_H'] == torque.total_H
+
+    assert all('error' in result for result in results[6:])
+    assert 'unknown material' in results[6]['error']
+
+
+def test_run_streams_batches_and_processes(tmp_path):
+    lines = [json.dumps(request) + '\n' for request in _requests()] * 20
+    expected = ''.join(evaluate_batch([line]) for line in lines)
+
+    for batch_size, processes in ((1, None), (7, None), (16, 2)):
+        output = io.StringIO()
+        run(io.StringIO(''.join(lines) + '\n\n'), output, batch_size=batch_size, processes=processes)
+        assert output.getvalue() == expected
+
+    with open(tmp_path / 'requests.jsonl', 'w') as f:
+        f.writelines(lines)
+    assert main([str(tmp_path / 'requests.jsonl'), '-o', str(tmp_path / 'results.jsonl')]) == 0
+    with open(tmp_path / 'results.jsonl') as f:
+        assert f.read() == expected
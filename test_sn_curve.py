@@ -1,17 +1,463 @@
-from sn_curve_iso_6336 import SnCurveIso6336
+import json
+import os
+import subprocess
+import sys
+
+import numpy as np
+import pytest
+
+import sn_curve_iso_6336
+from sn_curve_iso_6336 import (SnCurveIso6336, SnCurveRegistry, SnCurveTable, SnScatter, invalid_parameters, 
+                               materials_COB, read_dat_file, read_dat_files, write_dat_files)
+
 
 def check_results():
     material = SnCurveIso6336('18CrNiMo6', 1e3, 3e6,2520,1050,1e5,5e7,2400,1550)
 
     assert material.name == '18CrNiMo6'
-    p_F, p_H = material.calc_slope()[:2]
+    p_F, p_H = material.slope[:2]
     assert 9.1 < p_F < 9.2
     assert 14.1 < p_H < 14.3
-    for name, val in material.as_dict().items():
+    for name, val in material.to_dict().items():
         print(name, val)
     print('Great job, you made it to the end of the code checks!')
 
     print(repr(material))
     material.plot_SN_curve()
 
-check_results()
\ No newline at end of file
+
+def test_check_results():
+    import matplotlib.pyplot as plt
+
+    # plt.show of plot_SN_curve must not block on a machine with a display
+    plt.switch_backend('Agg')
+    check_results()
+    plt.close('all')
+
+
+def _catalogue_variants():
+    '''catalogue materials with and without reduction of life factors'''
+    for material in materials_COB:
+        for red_life_fac in (False, True):
+            yield SnCurveIso6336(material.name, material.N_F_stat, material.N_F_d,
+                                 material.sig_FP_stat, material.sig_FE, material.N_H_stat,
+                                 material.N_H_d, material.sig_HP_stat, material.sig_H_lim,
+                                 material.lim_pit_perm, red_life_fac)
+
+
+def test_calc_sig_perm_array_matches_scalar():
+    rng = np.random.default_rng(6336)
+    knees = [0, 1, 1e3, 3e6, 1e5, 6e5, 2e6, 1e7, 5e7, 1e9, 1e10, 2e10, 1e99, np.nan]
+    load_cycles = np.concatenate([knees, 10**rng.uniform(0, 12, 2000)])
+
+    for material in _catalogue_variants():
+        sig_F, sig_H = material.calc_sig_perm_array(load_cycles)
+        expected = np.array([material.calc_sig_perm(N) for N in load_cycles])
+        np.testing.assert_array_equal(sig_F, expected[:, 0])
+        np.testing.assert_array_equal(sig_H, expected[:, 1])
+        # NaN must not fall onto the endurance plateau
+        assert np.isnan(material.calc_sig_perm(np.nan)).all() and np.isnan(sig_H[13])
+
+
+def test_nan_input_propagates():
+    material = materials_COB[3]
+
+    assert np.isnan(material.calc_N_perm(np.nan)).all()
+    assert np.isnan(material.calc_N_perm(np.array([np.nan, 1000.]))[1][0])
+    damage = material.calc_damage([1500., 1500.], [1500., 1500.], [np.nan, 1e5])
+    assert np.isnan(damage.per_bin_F[0]) and np.isnan(damage.total_H)
+    assert np.isnan(SnCurveTable.from_curves(materials_COB[:2]).calc_sig_perm([np.nan, 1e5])[0][:, 0]).all()
+
+
+def test_calc_sig_perm_array_keeps_shape():
+    material = materials_COB[3]
+    load_cycles = np.geomspace(1, 1e11, 24).reshape(2, 3, 4)
+
+    sig_F, sig_H = material.calc_sig_perm_array(load_cycles)
+
+    assert sig_F.shape == sig_H.shape == (2, 3, 4)
+    assert sig_F[1, 2, 3] == material.calc_sig_perm(load_cycles[1, 2, 3])[0]
+
+
+def test_calc_sig_perm_lim_pit_perm():
+    # values of WL_AT-04_...dat, flank with two slopes for limited pitting
+    material = materials_COB[3]
+    load_cycles = np.array([6e5, 7e5, 1e7, 2e7, 1e9])
+
+    sig_H = material.calc_sig_perm_array(load_cycles)[1]
+
+    np.testing.assert_array_equal(np.round(sig_H, 1), [2400.0, 2382.5, 2100.0, 2051.8, 1800.0])
+
+
+def test_calc_N_perm_inverts_calc_sig_perm():
+    load_cycles = np.geomspace(1.1e3, 9e9, 500)
+
+    for material in _catalogue_variants():
+        sig_F, sig_H = material.calc_sig_perm_array(load_cycles)
+        N_F, N_H = material.calc_N_perm(sig_F)[0], material.calc_N_perm(sig_H)[1]
+
+        # plateaus map to their upper end, sloped segments back onto the load cycles
+        sloped_F = (sig_F < material.sig_FP_stat) & (sig_F > sig_F.min())
+        sloped_H = (sig_H < material.sig_HP_stat) & (sig_H > sig_H.min())
+        np.testing.assert_allclose(N_F[sloped_F], load_cycles[sloped_F], rtol=1e-9)
+        np.testing.assert_allclose(N_H[sloped_H], load_cycles[sloped_H], rtol=1e-9)
+
+
+def test_calc_N_perm_limits():
+    material = SnCurveIso6336('18CrNiMo6', 1e3, 3e6, 2520, 1050, 1e5, 5e7, 2400, 1550)
+
+    N_F, N_H = material.calc_N_perm(np.array([3000., 2520., 1050., 1000., 0.]))
+
+    np.testing.assert_allclose(N_F[:2], [0., 1e3])
+    assert np.all(np.isinf(N_F[2:]))
+    np.testing.assert_allclose(N_H[[0, 1]], [0., 0.])
+    np.testing.assert_allclose(material.calc_N_perm(2400.)[1], 1e5)
+    assert np.all(np.isinf(N_H[3:]))
+    assert np.ndim(material.calc_N_perm(1200.)[0]) == 0
+
+    material.red_life_fac = True
+    N_F, N_H = material.calc_N_perm(np.array([1050., 0.9 * 1050, 0.85 * 1050]))
+    np.testing.assert_allclose(N_F[0], 3e6)
+    assert 3e6 < N_F[1] < 1e10
+    assert np.isinf(N_F[2])
+
+
+def test_coefficients_cached_and_invalidated():
+    material = SnCurveIso6336('18CrNiMo6', 1e3, 3e6, 2520, 1050, 1e5, 5e7, 2400, 1550)
+
+    coefficients = material.coefficients
+    assert material.coefficients is coefficients
+    assert material.slope is coefficients.slope
+    assert not coefficients.foot.sig_ref.flags.writeable
+
+    material.name = 'renamed'
+    assert material.coefficients is coefficients
+
+    material.sig_FE = 1000
+    assert material.coefficients is not coefficients
+    assert material.calc_sig_perm(1e8)[0] == 1000
+
+    # changes are checked like the constructor, the old value is kept
+    coefficients = material.coefficients
+    with pytest.raises(ValueError, match='sig_FE < sig_FP_stat'):
+        material.sig_FE = 3000
+    assert material.sig_FE == 1000 and material.coefficients is coefficients
+    assert not hasattr(material, '__dict__')
+
+
+def test_identical_curves_share_coefficients():
+    # AT-01 and AT-05 differ only in their name
+    at_01, at_05 = materials_COB[0], materials_COB[4]
+    copy = SnCurveIso6336('copy', 1000, 3000000, 2520, 1050, 100000, 50000000, 2400, 1550, 0, False)
+
+    assert at_01.key == at_05.key == copy.key
+    assert at_01.coefficients is at_05.coefficients is copy.coefficients
+    assert materials_COB[2].coefficients is not at_01.coefficients
+
+    copy.red_life_fac = True
+    assert copy.key != at_01.key and copy.coefficients is not at_01.coefficients
+
+
+def test_registry_maps_materials_onto_distinct_curves():
+    registry = SnCurveRegistry(materials_COB)
+
+    assert len(registry) == 9 and len(registry.names) == len(materials_COB)
+    assert registry.canonical(materials_COB[4]) is materials_COB[0]
+    assert registry.add(materials_COB[6]) == registry.rows[2]
+
+    load_cycles = np.geomspace(1, 1e11, 50)
+    sig_F, sig_H = registry.table.calc_sig_perm(load_cycles)
+    for material, row in zip(materials_COB, registry.rows):
+        expected_F, expected_H = material.calc_sig_perm_array(load_cycles)
+        np.testing.assert_array_equal(sig_F[row], expected_F)
+        np.testing.assert_array_equal(sig_H[row], expected_H)
+
+
+def test_curve_table_matches_curves():
+    materials = list(_catalogue_variants())
+    table = SnCurveTable.from_curves(materials)
+    load_cycles = np.concatenate([[0, 1e3, 3e6, 1e7, 1e10, 1e99], np.geomspace(1, 1e11, 300)])
+
+    sig_F, sig_H = table.calc_sig_perm(load_cycles)
+
+    assert sig_F.shape == sig_H.shape == (len(materials), len(load_cycles))
+    for i, material in enumerate(materials):
+        expected_F, expected_H = material.calc_sig_perm_array(load_cycles)
+        np.testing.assert_array_equal(sig_F[i], expected_F)
+        np.testing.assert_array_equal(sig_H[i], expected_H)
+        assert tuple(p[i] for p in table.slope) == material.slope
+    assert table[3].name == materials[3].name
+
+
+def test_curve_table_cycles_per_material():
+    table = SnCurveTable.from_curves(materials_COB[:2])
+    load_cycles = np.array([[1e4, 1e6], [1e8, 1e9]])
+
+    sig_F, sig_H = table.calc_sig_perm(load_cycles)
+
+    assert sig_H[1, 0] == materials_COB[1].calc_sig_perm(1e8)[1]
+    assert sig_F[0, 1] == materials_COB[0].calc_sig_perm(1e6)[0]
+
+
+def test_curve_table_damage_matches_curves():
+    materials = list(_catalogue_variants())
+    table = SnCurveTable.from_curves(materials)
+    stress_F = np.array([3000., 2520., 1500., 1200., 1000., 850.])
+    stress_H = np.array([2600., 2400., 2000., 1600., 1500., 1300.])
+    cycles = np.array([0., 1., 1e3, 1e5, 1e7, 1e9])
+
+    damage = table.calc_damage(stress_F, stress_H, cycles)
+
+    assert damage.per_bin_F.shape == (len(materials), 6) and damage.total_H.shape == (len(materials),)
+    for i, material in enumerate(materials):
+        expected = material.calc_damage(stress_F, stress_H, cycles)
+        np.testing.assert_array_equal(damage.per_bin_F[i], expected.per_bin_F)
+        np.testing.assert_array_equal(damage.per_bin_H[i], expected.per_bin_H)
+
+
+def test_invalid_parameters_lists_offending_rows():
+    sig_FE = np.array([1050., 2600., 1050., np.nan])
+    N_H_d = np.array([5e7, 5e7, 5e6, 5e7])
+
+    invalid = invalid_parameters(1e3, 3e6, 2520, sig_FE, 1e5, N_H_d, 2400, 1550, lim_pit_perm=True)
+
+    assert invalid.keys() == {'0 < sig_FE < inf', 'sig_FE < sig_FP_stat', 'N_H_stat < 1e7 < N_H_d with lim_pit_perm'}
+    assert invalid['sig_FE < sig_FP_stat'].tolist() == [1, 3]
+    assert invalid['N_H_stat < 1e7 < N_H_d with lim_pit_perm'].tolist() == [2]
+    assert invalid_parameters(1e3, 3e6, 2520, 1050, 1e5, 5e7, 2400, 1550) == {}
+
+
+def test_invalid_curve_raises():
+    with pytest.raises(ValueError, match='sig_FE < sig_FP_stat'):
+        SnCurveIso6336('18CrNiMo6', 1e3, 3e6, 2520, 2600, 1e5, 5e7, 2400, 1550)
+    with pytest.raises(ValueError, match='N_F_d < 1e10'):
+        SnCurveIso6336('18CrNiMo6', 1e3, 3e10, 2520, 1050, 1e5, 5e7, 2400, 1550, red_life_fac=True)
+    with pytest.raises(ValueError, match=r'N_F_stat < N_F_d is violated in 2 rows \[1, 3\]'):
+        SnCurveTable(None, [1e3, 1e7, 1e3, 1e7], 3e6, 2520, 1050, 1e5, 5e7, 2400, 1550)
+
+
+def test_curve_table_from_arrays():
+    rng = np.random.default_rng(0)
+    size = 1000
+    parameters = {'N_F_stat': 1e3, 'N_F_d': 3e6, 'sig_FP_stat': 2520, 'N_H_stat': 1e5, 'N_H_d': 5e7, 
+                  'sig_HP_stat': 2400, 'sig_FE': rng.uniform(800, 1200, size), 
+                  'sig_H_lim': rng.uniform(1200, 1600, size)}
+
+    table = SnCurveTable.from_arrays(parameters)
+
+    assert len(table) == size and table.names == range(size)
+    assert sum(getattr(table, name).nbytes for name in sn_curve_iso_6336._PARAMETERS) / size == 66
+    assert table[7].name == '7' and table[7].sig_FE == parameters['sig_FE'][7]
+    assert not table.red_life_fac.any()
+    parameters['sig_FE'][[3, 500]] = 3000
+    with pytest.raises(ValueError, match=r'in 2 rows \[3, 500\]'):
+        SnCurveTable.from_arrays(parameters)
+
+
+def test_curve_table_chunks_of_rows(monkeypatch):
+    materials = list(_catalogue_variants())
+    stress = np.array([3000., 2000., 1500., 1200., 1000., 800.])
+    cycles = np.geomspace(1, 1e11, 20)
+    expected_sig = SnCurveTable.from_curves(materials).calc_sig_perm(cycles)
+    expected_damage = SnCurveTable.from_curves(materials).calc_damage(stress, stress, cycles[:6])
+    per_material = np.tile(cycles, (len(materials), 1))
+
+    monkeypatch.setattr(sn_curve_iso_6336, '_SEGMENT_ROWS', 5)
+    table = SnCurveTable.from_curves(materials)
+
+    np.testing.assert_array_equal(table.calc_sig_perm(cycles), expected_sig)
+    np.testing.assert_array_equal(table.calc_sig_perm(per_material), expected_sig)
+    damage = table.calc_damage(stress, stress, cycles[:6])
+    np.testing.assert_array_equal(damage.per_bin_F, expected_damage.per_bin_F)
+    np.testing.assert_array_equal(damage.total_H, expected_damage.total_H)
+    assert table._segments is None
+
+
+def test_calc_failure_probability_anchored_at_one_percent():
+    material = SnCurveIso6336('18CrNiMo6', 1e3, 3e6, 2520, 1050, 1e5, 5e7, 2400, 1550)
+
+    # one load level at the nominal endurance limits in the endurance range
+    for scatter in (SnScatter('lognormal', 0.05), SnScatter('weibull', 20.)):
+        reliability = material.calc_failure_probability(
+            [1050.], [1550.], [1e9], {'sig_FE': scatter, 'sig_H_lim': scatter}, samples=200000, seed=1)
+        for probability, (lower, upper) in ((reliability.probability_F, reliability.interval_F),
+                                            (reliability.probability_H, reliability.interval_H)):
+            assert lower < 0.01 < upper
+            assert abs(probability - 0.01) < 0.002
+        assert reliability.probability >= reliability.probability_F
+
+
+def test_calc_failure_probability_reproducible():
+    material = SnCurveIso6336('18CrNiMo6', 1e3, 3e6, 2520, 1050, 1e5, 5e7, 2400, 1550, 1, 1)
+    scatter = {'load': SnScatter('lognormal', 0.1, 0.5), 'N_F_d': SnScatter('weibull', 3.),
+               'sig_FE': SnScatter('lognormal', 0.05), 'sig_H_lim': SnScatter('weibull', 15.)}
+    stress_F = np.array([[1300., 1100., 900.], [1000., 950., 900.]])
+    stress_H = np.array([[1800., 1600., 1500.], [1500., 1450., 1400.]])
+    cycles = np.array([1e5, 1e6, 1e8])
+
+    single = material.calc_failure_probability(stress_F, stress_H, cycles, scatter, samples=50000,
+                                               chunk_size=4096, seed=6336)
+    parallel = material.calc_failure_probability(stress_F, stress_H, cycles, scatter, samples=50000,
+                                                 chunk_size=4096, seed=6336, processes=2)
+
+    assert single.failures.shape == (2,)
+    np.testing.assert_array_equal(single.failures_F, parallel.failures_F)
+    np.testing.assert_array_equal(single.failures, parallel.failures)
+    assert single.probability[0] > single.probability[1] > 0
+
+
+def test_calc_failure_probability_long_spectrum_bounded(monkeypatch):
+    import tracemalloc
+
+    material = SnCurveIso6336('18CrNiMo6', 1e3, 3e6, 2520, 1050, 1e5, 5e7, 2400, 1550)
+    scatter = {'load': SnScatter('lognormal', 0.1, 0.5), 'sig_FE': SnScatter('lognormal', 0.05)}
+    # two load duration distributions of 5000 bins
+    stress_F = np.linspace([1400., 1300.], [900., 800.], 5000, axis=-1)
+    stress_H = 1.4 * stress_F
+    cycles = np.full(5000, 2e4)
+
+    def evaluate():
+        return material.calc_failure_probability(stress_F, stress_H, cycles, scatter, samples=2048,
+                                                 chunk_size=1024, seed=6336)
+
+    monkeypatch.setattr(sn_curve_iso_6336, '_DAMAGE_ELEMENTS', 10**9)
+    expected = evaluate()
+    monkeypatch.setattr(sn_curve_iso_6336, '_DAMAGE_ELEMENTS', 2**16)
+    tracemalloc.start()
+    blocked = evaluate()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    np.testing.assert_array_equal(blocked.failures_F, expected.failures_F)
+    np.testing.assert_array_equal(blocked.failures_H, expected.failures_H)
+    assert 0 < expected.probability[1] < expected.probability[0] < 1
+    # a grid of all samples of the chunk and bins would take 1024 * 10000 * 8 bytes = 82 MB
+    assert peak < 8e6
+
+
+def test_calc_failure_probability_invalid_scatter():
+    material = materials_COB[0]
+
+    with pytest.raises(ValueError):
+        material.calc_failure_probability([1000.], [1500.], [1e6], {'lim_pit_perm': SnScatter('weibull', 2.)})
+    with pytest.raises(ValueError):
+        material.calc_failure_probability([1000.], [1500.], [1e6], {'sig_FE': SnScatter('normal', 2.)})
+
+
+def test_calc_damage_miner():
+    material = SnCurveIso6336('18CrNiMo6', 1e3, 3e6, 2520, 1050, 1e5, 5e7, 2400, 1550)
+    stress_F = np.array([1200., 1500., 1000., 3000.])
+    stress_H = np.array([1600., 1700., 1500., 1550.])
+    cycles = np.array([1e5, 1e4, 1e9, 0.])
+
+    damage = material.calc_damage(stress_F, stress_H, cycles)
+
+    N_F, N_H = material.calc_N_perm(stress_F)[0], material.calc_N_perm(stress_H)[1]
+    np.testing.assert_allclose(damage.per_bin_F, [1e5 / N_F[0], 1e4 / N_F[1], 0., 0.])
+    np.testing.assert_allclose(damage.per_bin_H, [1e5 / N_H[0], 1e4 / N_H[1], 0., 0.])
+    np.testing.assert_allclose(damage.total_F, damage.per_bin_F.sum())
+
+    # batch of spectra along leading axes, overload gives infinite damage
+    batch = material.calc_damage(np.stack([stress_F, stress_F * 1.1]), stress_H, 
+                                 np.array([1e5, 1e4, 1e9, 1.]))
+    assert batch.total_F.shape == (2,)
+    assert np.isinf(batch.total_F[0]) and np.isinf(batch.per_bin_F[1, 3])
+
+
+def test_calc_damage_torque_halves_flank_exponent():
+    material = SnCurveIso6336('18CrNiMo6', 1e3, 3e6, 2520, 1050, 1e5, 5e7, 2400, 1550)
+    p_F, p_H = material.slope[:2]
+
+    damage = material.calc_damage_torque([1000., 1100.], [1e6, 1e6], torque_ref=1000., 
+                                         sig_F_ref=1200., sig_H_ref=1700.)
+
+    np.testing.assert_allclose(damage.per_bin_F[1] / damage.per_bin_F[0], 1.1**p_F)
+    np.testing.assert_allclose(damage.per_bin_H[1] / damage.per_bin_H[0], 1.1**(p_H / 2))
+
+
+def test_write_dat_file_matches_released_file(tmp_path):
+    released = 'WL_AT-04_18CrNiMo7-6(COB)_LN_190-3_lim_pit_perm_shot_peened_LN_523-1.dat'
+    path = materials_COB[3].write_dat_file(str(tmp_path))
+
+    assert os.path.basename(path) == released
+    with open(released, encoding='latin-1') as f:
+        expected = f.read().splitlines()
+    with open(path) as f:
+        written = f.read().splitlines()
+    # line 3 holds the creation date
+    assert written[:2] + written[3:] == expected[:2] + expected[3:]
+
+
+def test_write_dat_files_identical_to_write_dat_file(tmp_path):
+    single = tmp_path / 'single'
+    single.mkdir()
+    for material in materials_COB:
+        material.write_dat_file(str(single))
+
+    for processes in (None, 2):
+        bulk = tmp_path / f'bulk_{processes}'
+        paths = write_dat_files(materials_COB, str(bulk), processes=processes)
+        assert len(paths) == len(materials_COB)
+        for path in paths:
+            with open(path, 'rb') as f, open(single / os.path.basename(path), 'rb') as g:
+                assert f.read() == g.read()
+
+
+def _parameters(material):
+    return [float(getattr(material, name)) for name in ('N_F_stat', 'N_F_d', 'sig_FP_stat', 'sig_FE', 
+            'N_H_stat', 'N_H_d', 'sig_HP_stat', 'sig_H_lim', 'lim_pit_perm', 'red_life_fac')]
+
+
+def test_read_dat_file_released():
+    table = read_dat_file('WL_AT-04_18CrNiMo7-6(COB)_LN_190-3_lim_pit_perm_shot_peened_LN_523-1.dat')
+
+    assert table.name == materials_COB[3].name
+    assert table.cycles.shape == table.sig_perm_F.shape == table.sig_perm_H.shape == (74,)
+    assert table.sig_perm_F[0] == 2520. and table.sig_perm_H[-1] == 1800.
+    assert table.matches(materials_COB[3]) == (True, True)
+    assert _parameters(table.to_curve()) == _parameters(materials_COB[3])
+
+
+def test_read_dat_files_round_trip(tmp_path):
+    materials = list(_catalogue_variants())[::3]
+    materials.append(SnCurveIso6336('off_grid', 1.5e3, 2.5e6, 2500, 1000, 1.5e5, 1e9, 2300, 1500, 1, 1))
+    # knee below the first grid point, the plateau end on the grid is a degenerate candidate
+    materials.append(SnCurveIso6336('below_grid', 500, 3e6, 2520, 1050, 1e5, 5e7, 2400, 1550))
+    for i, material in enumerate(materials):
+        material.name = f'{i:02d}_{material.name}'
+    write_dat_files(materials, str(tmp_path))
+
+    tables = read_dat_files(str(tmp_path), processes=2)
+
+    assert len(tables) == len(materials)
+    for table, material in zip(tables.values(), materials):
+        assert table.name == material.name
+        assert _parameters(table.to_curve()) == _parameters(material)
+
+
+# cold-start budget in seconds for importing the module after NumPy
+IMPORT_BUDGET = 0.25
+
+_IMPORT_BENCHMARK = """
+import json, sys, time
+import numpy
+start = time.perf_counter()
+import sn_curve_iso_6336
+duration = time.perf_counter() - start
+heavy = [name for name in ('matplotlib', 'pandas', 'multiprocessing') if name in sys.modules]
+sys.stderr.write(json.dumps({'duration': duration, 'heavy': heavy}))
+"""
+
+
+def test_import_is_fast_and_side_effect_free():
+    result = subprocess.run([sys.executable, '-c', _IMPORT_BENCHMARK], capture_output=True, 
+                            text=True, check=True, cwd=os.path.dirname(os.path.abspath(__file__)))
+    benchmark = json.loads(result.stderr)
+
+    assert result.stdout == ''
+    assert benchmark['heavy'] == []
+    assert benchmark['duration'] < IMPORT_BUDGET, benchmark
+
+
+if __name__ == '__main__':
+    check_results()
@@ -0,0 +1,66 @@
+import numpy as np
+
+from sn_curve_iso_6336 import materials_COB
+from sn_design import max_load_scale, max_torque_scale
+
+
+def _spectra(gears: int = 40, bins: int = 12):
+    rng = np.random.default_rng(0)
+    return (rng.uniform(200, 1500, (gears, bins)), rng.uniform(500, 2000, (gears, bins)),
+            10**rng.uniform(2, 9, (gears, bins)))
+
+
+def test_max_load_scale_reaches_damage_limit():
+    stress_F, stress_H, cycles = _spectra()
+    design = max_load_scale(materials_COB, stress_F, stress_H, cycles)
+    assert design.scale.shape == (40, len(materials_COB))
+
+    for m, material in enumerate(materials_COB):
+        for g in range(len(cycles)):
+            scale_F, scale_H = design.scale_F[g, m], design.scale_H[g, m]
+            damage = material.calc_damage(stress_F[g] * scale_F, stress_H[g] * scale_H, cycles[g])
+            above = material.calc_damage(stress_F[g] * scale_F * (1 + 1e-8),
+                                         stress_H[g] * scale_H * (1 + 1e-8), cycles[g])
+            assert damage.total_F <= 1 + 1e-12 and damage.total_H <= 1 + 1e-12
+            assert above.total_F > 1 and above.total_H > 1
+    np.testing.assert_array_equal(design.passes, design.scale >= 1)
+
+
+def test_max_load_scale_closed_form_and_limits():
+    material = materials_COB[0]
+    # all bins on the finite life segment of the foot: s = D**(-1 / p_F)
+    stress = np.array([1100., 1200., 1300.])
+    cycles = np.array([1e5, 1e4, 1e3])
+    damage = material.calc_damage(stress, stress, cycles).total_F
+    design = max_load_scale([material], stress, stress, cycles)
+    np.testing.assert_allclose(design.scale_F, [damage**(-1 / material.slope[0])], rtol=1e-14)
+
+    # few cycles: the static limit governs, no cycles: no damage at any scale
+    design = max_load_scale([material], [[1000., 500.], [1000., 500.]], [[1000., 500.], [1000., 500.]],
+                            [[1., 1e3], [0., 0.]])
+    np.testing.assert_allclose(design.scale_F[0], [material.sig_FP_stat / 1000])
+    assert np.isinf(design.scale[1]).all() and design.passes[1].all()
+
+
+def test_max_torque_scale():
+    _, _, cycles = _spectra(4)
+    torque = np.random.default_rng(1).uniform(500, 1500, cycles.shape)
+    design = max_torque_scale(materials_COB[:4], torque, cycles, 1000, 1200, 1600)
+    for m, material in enumerate(materials_COB[:4]):
+        for g in range(len(cycles)):
+            damage = material.calc_damage_torque(torque[g] * design.scale[g, m], cycles[g], 1000, 1200, 1600)
+            above = material.calc_damage_torque(torque[g] * design.scale[g, m] * (1 + 1e-8), cycles[g], 1000,
+                                                1200, 1600)
+            assert max(damage.total_F, damage.total_H) <= 1 + 1e-9
+            assert max(above.total_F, above.total_H) > 1
+
+
+def test_max_load_scale_chunked_by_elements(monkeypatch):
+    import sn_design
+    stress_F, stress_H, cycles = _spectra(gears=30, bins=200)
+    single = max_load_scale(materials_COB[:3], stress_F, stress_H, cycles)
+    # at most 2 pairs of 200 bins per chunk
+    monkeypatch.setattr(sn_design, '_DESIGN_ELEMENTS', 500)
+    chunked = max_load_scale(materials_COB[:3], stress_F, stress_H, cycles)
+    np.testing.assert_array_equal(chunked.scale_F, single.scale_F)
+    np.testing.assert_array_equal(chunked.scale_H, single.scale_H)
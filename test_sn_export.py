@@ -0,0 +1,75 @@
+import csv
+
+import numpy as np
+import pytest
+
+from sn_curve_iso_6336 import SnCurveTable, materials_COB
+from sn_export import PARAMETER_COLUMNS, export_grid, export_parameters
+
+
+def _expected_parameters():
+    return [[float(value) if not isinstance(value, str) else value for value in material.to_dict().values()]
+            for material in materials_COB]
+
+
+def test_export_parameters(tmp_path):
+    expected = _expected_parameters()
+
+    export_parameters(materials_COB, str(tmp_path / 'parameters.csv'), chunk_size=4)
+    with open(tmp_path / 'parameters.csv', newline='') as f:
+        rows = list(csv.reader(f))
+    assert tuple(rows[0]) == PARAMETER_COLUMNS
+    assert [[row[0]] + [float(value == 'True') if value in ('True', 'False') else float(value)
+                        for value in row[1:]] for row in rows[1:]] == expected
+
+    for format in ('npy', 'npz'):
+        path = str(tmp_path / f'parameters.{format}')
+        export_parameters(materials_COB, path, chunk_size=4)
+        table = np.load(path)
+        assert [[table[name][i].item() if name == 'name' else float(table[name][i])
+                 for name in PARAMETER_COLUMNS] for i in range(len(materials_COB))] == expected
+
+
+def test_export_grid(tmp_path):
+    load_cycles = np.geomspace(1, 1e11, 37)
+    sig_perm_F, sig_perm_H = SnCurveTable.from_curves(materials_COB).calc_sig_perm(load_cycles)
+
+    export_grid(materials_COB, load_cycles, str(tmp_path / 'grid.npy'), chunk_size=4)
+    grid = np.load(tmp_path / 'grid.npy', mmap_mode='r')
+    assert isinstance(grid, np.memmap) and grid.shape == (2, len(materials_COB), 37)
+    np.testing.assert_array_equal(grid[0], sig_perm_F)
+    np.testing.assert_array_equal(grid[1], sig_perm_H)
+
+    export_grid(materials_COB, load_cycles, str(tmp_path / 'grid.npz'), chunk_size=4)
+    with np.load(tmp_path / 'grid.npz') as archive:
+        assert archive['name'].tolist() == [material.name for material in materials_COB]
+        np.testing.assert_array_equal(archive['load_cycles'], load_cycles)
+        np.testing.assert_array_equal(archive['sig_perm_H'], sig_perm_H)
+
+    export_grid(materials_COB, load_cycles, str(tmp_path / 'grid.csv'), chunk_size=4)
+    with open(tmp_path / 'grid.csv', newline='') as f:
+        rows = list(csv.reader(f))
+    assert len(rows) == 1 + 2 * len(materials_COB)
+    assert rows[3][:2] == [materials_COB[1].name, 'F']
+    np.testing.assert_array_equal(np.array(rows[3][2:], dtype=float), sig_perm_F[1])
+
+
+def test_export_parquet(tmp_path):
+    pq = pytest.importorskip('pyarrow.parquet')
+    load_cycles = np.geomspace(1, 1e11, 5)
+
+    export_parameters(materials_COB, str(tmp_path / 'parameters.parquet'), chunk_size=4)
+    export_grid(materials_COB, load_cycles, str(tmp_path / 'grid.parquet'), chunk_size=4)
+
+    assert pq.read_table(tmp_path / 'parameters.parquet').column_names == list(PARAMETER_COLUMNS)
+    grid = pq.read_table(tmp_path / 'grid.parquet')
+    assert grid.num_rows == len(materials_COB)
+    np.testing.assert_array_equal(grid.column('sig_perm_F')[2].as_py(),
+                                  materials_COB[2].calc_sig_perm_array(load_cycles)[0])
+
+
+def test_export_unsupported_format(tmp_path):
+    with pytest.raises(ValueError):
+        export_grid(materials_COB, [1e6], str(tmp_path / 'grid.xlsx'))
+    with pytest.raises(ValueError):
+        export_parameters(materials_COB, str(tmp_path / 'parameters.txt'))
@@ -0,0 +1,73 @@
+import json
+
+import numpy as np
+
+import sn_curve_iso_6336
+from sn_curve_iso_6336 import SnCurveIso6336, SnCurveTable, materials_COB, write_dat_files
+from sn_instrument import SnStats
+
+
+def test_counts_per_curve_and_branch():
+    plain = SnCurveIso6336.calc_sig_perm
+    at_01, at_04 = materials_COB[0], materials_COB[3]
+
+    with SnStats() as stats:
+        assert SnCurveIso6336.calc_sig_perm is not plain
+        at_01.calc_sig_perm(1e5)
+        at_01.calc_sig_perm_array([1., 1e4, 1e9, 1e11])
+        at_04.calc_damage([3000., 1200.], [1000., 1500.], [10., 1e5])
+        at_04.slope
+        SnCurveTable.from_curves(materials_COB[:2]).calc_damage([1200., 1300.], [1500., 1600.], [1e4, 1e4])
+
+    assert SnCurveIso6336.calc_sig_perm is plain
+    assert stats.evaluations[at_01.name] == {'sig_perm': 5, 'damage': 2}
+    assert stats.evaluations[at_04.name] == {'damage': 2, 'slope': 1}
+    assert stats.evaluations[materials_COB[1].name] == {'damage': 2}
+    # at_01: N = 1, 1e4, 1e5, 1e9, 1e11, at_04: 3000 and 1200 (sig_FE 1400), table: 4 finite
+    assert stats.branches['foot'] == {'static': 2, 'finite': 6, 'endurance': 3}
+    assert stats.branches['flank']['limited_pitting'] == 1
+    assert sum(stats.branches['flank'].values()) == 11
+
+
+def test_stage_timers_callback_and_dump(tmp_path):
+    calls = []
+    with SnStats(callback=lambda stage, seconds: calls.append(stage)) as outer:
+        with SnStats() as inner:
+            write_dat_files(materials_COB[:3], str(tmp_path))
+        materials_COB[0].write_dat_file(str(tmp_path))
+
+    assert inner.stages['dat.io']['calls'] == 3
+    assert outer.stages['dat.io']['calls'] == 4
+    assert outer.stages['dat.compute']['seconds'] > 0
+    assert calls.count('dat.io') == 4
+
+    outer.dump(str(tmp_path / 'stats.json'))
+    with open(tmp_path / 'stats.json') as f:
+        assert json.load(f) == json.loads(json.dumps(outer.to_dict()))
+
+
+def test_disabled_without_context():
+    with SnStats() as stats:
+        pass
+    materials_COB[0].calc_sig_perm_array(np.geomspace(1, 1e11, 10))
+    assert stats.evaluations == {} and stats.stages == {}
+
+
+def test_table_counts_in_chunks_of_rows(monkeypatch):
+    columns = [[getattr(material, name) for material in materials_COB] for name in sn_curve_iso_6336._PARAMETERS]
+    stress = np.array([3000., 2000., 1500., 1200., 1000., 800.])
+
+    def record():
+        with SnStats() as stats:
+            table = SnCurveTable(None, *columns)
+            table.calc_N_perm(stress)
+            table.calc_sig_perm(np.geomspace(1, 1e11, 20))
+        return stats
+
+    expected = record()
+    monkeypatch.setattr(sn_curve_iso_6336, '_SEGMENT_ROWS', 4)
+    chunked = record()
+
+    assert chunked.branches == expected.branches
+    assert chunked.evaluations == {'SnCurveTable(15 materials)': {'N_perm': 90, 'sig_perm': 300}}
+    assert sum(chunked.branches['flank'].values()) == 390
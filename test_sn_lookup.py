@@ -0,0 +1,68 @@
+import itertools
+import math
+
+import numpy as np
+import pytest
+
+from sn_curve_iso_6336 import materials_COB
+from sn_lookup import SnLookupTable
+from test_sn_curve import _catalogue_variants
+
+
+def test_lookup_table_within_max_rel_error():
+    rng = np.random.default_rng(14)
+    load_cycles = np.concatenate([[0., 1., 1e3, 1e5, 3e6, 1e7, 5e7, 1e9, 1e10, 1e20], 10**rng.uniform(-1, 11, 20000)])
+    stress = np.concatenate([[0., 892.5, 1050., 1400., 1550., 1800., 2400., 2520., 3000.],
+                             rng.uniform(800, 2600, 20000)])
+
+    # AT-01 plain and with red_life_fac, AT-02 with lim_pit_perm, without and with red_life_fac
+    for curve in itertools.islice(_catalogue_variants(), 4):
+        table = SnLookupTable.from_curve(curve, max_rel_error=1e-5)
+
+        for approx, exact in zip(table.sig_perm(load_cycles), curve.calc_sig_perm_array(load_cycles)):
+            np.testing.assert_allclose(approx, exact, rtol=1e-5, atol=0)
+        for approx, exact in zip(table.N_perm(stress), curve.calc_N_perm(stress)):
+            # infinite life and overload exactly like the curve
+            np.testing.assert_array_equal(np.isinf(approx), np.isinf(exact))
+            np.testing.assert_array_equal(approx == 0, exact == 0)
+            finite = np.isfinite(exact) & (exact > 0)
+            np.testing.assert_allclose(approx[finite], exact[finite], rtol=1e-5, atol=0)
+
+
+def test_lookup_table_scalar_matches_array():
+    curve = materials_COB[3]
+    table = SnLookupTable.from_curve(curve)
+
+    for N in (0., 0.5, 1e3, 2.2e4, 3.3e6, 1e7, 1.7e8, 1e10, 1e12):
+        assert table(N) == pytest.approx(tuple(float(sig) for sig in table.sig_perm(N)), rel=1e-14)
+    for sig_F, sig_H in ((1000., 1700.), (1500., 2200.), (2600., 2400.), (2520., 2500.)):
+        N_F, N_H = table.N_perm(sig_F, sig_H)
+        with np.errstate(divide='ignore'):
+            expected = (1 / N_F, 1 / N_H)
+        assert table.damage_increment(sig_F, sig_H) == pytest.approx(expected, rel=1e-14)
+    # NaN is not clamped onto the static limit or infinite life, like calc_sig_perm and calc_N_perm
+    assert all(math.isnan(sig) for sig in table(math.nan))
+    assert all(np.isnan(sig[0]) and sig[1] > 0 for sig in table.sig_perm([np.nan, 1e5]))
+    assert all(np.isnan(N[0]) and N[1] > 0 for N in table.N_perm([np.nan, 1500.]))
+    damage = table.damage_increment(math.nan, 2200.)
+    assert math.isnan(damage[0]) and damage[1] > 0
+
+
+def test_lookup_table_save_and_load_memory_map(tmp_path):
+    curve = materials_COB[1]
+    table = SnLookupTable.from_curve(curve)
+    path = str(tmp_path / 'AT-02.npy')
+
+    table.save(path)
+    loaded = SnLookupTable.load(path)
+
+    assert isinstance(loaded.data, np.memmap) and len(loaded) == len(table)
+    load_cycles = np.geomspace(1, 1e11, 100)
+    np.testing.assert_array_equal(loaded.sig_perm(load_cycles), table.sig_perm(load_cycles))
+    assert loaded(4e6) == table(4e6)
+    assert loaded.validate(curve) <= 1e-4
+
+
+def test_lookup_table_max_points():
+    with pytest.raises(ValueError):
+        SnLookupTable.from_curve(materials_COB[1], max_rel_error=1e-12, max_points=10**4)
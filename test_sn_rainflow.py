@@ -0,0 +1,97 @@
+import numpy as np
+
+from sn_curve_iso_6336 import materials_COB
+from sn_rainflow import RainflowCounter, rainflow_file, _closed_cycles
+
+
+def _reference_histogram(x, edges):
+    '''rainflow counting of the whole series with the textbook four-point stack algorithm'''
+    x = np.asarray(x, dtype=float)
+    x = x[np.concatenate(([True], np.diff(x) != 0))]
+    direction = np.sign(np.diff(x))
+    reversals = x[np.concatenate(([True], direction[1:] != direction[:-1], [True]))]
+
+    stack = []
+    counter = RainflowCounter(edges)
+    for value in reversals:
+        stack.append(value)
+        while len(stack) >= 4:
+            inner = abs(stack[-2] - stack[-3])
+            if inner <= abs(stack[-3] - stack[-4]) and inner <= abs(stack[-1] - stack[-2]):
+                counter._add(np.array([max(abs(stack[-2]), abs(stack[-3]))]), 1.)
+                del stack[-3:-1]
+            else:
+                break
+    stack = np.abs(stack)
+    counter._add(np.maximum(stack[:-1], stack[1:]), 0.5)
+    return counter.counts
+
+
+def test_closed_cycles_independent_of_removal_order():
+    rng = np.random.default_rng(1)
+    # integer levels give many equal ranges
+    x = rng.integers(0, 8, 5000).astype(float)
+    x = x[np.concatenate(([True], np.diff(x) != 0))]
+    direction = np.sign(np.diff(x))
+    reversals = x[np.concatenate(([True], direction[1:] != direction[:-1], [True]))]
+
+    residue_vec, peaks_vec = _closed_cycles(reversals, min_removed=1)
+    residue_stack, peaks_stack = _closed_cycles(reversals, min_removed=len(reversals))
+
+    np.testing.assert_array_equal(residue_vec, residue_stack)
+    np.testing.assert_array_equal(np.sort(peaks_vec), np.sort(peaks_stack))
+
+
+def test_chunks_equal_single_pass():
+    rng = np.random.default_rng(2)
+    x = np.cumsum(rng.normal(size=20000)) + rng.integers(0, 3, 20000)
+    edges = np.linspace(0, np.abs(x).max(), 41)
+
+    counter = RainflowCounter(edges)
+    counter.update(x)
+    single = counter.histogram()
+    np.testing.assert_array_equal(single.counts, _reference_histogram(x, edges))
+
+    for chunk_size in (1, 2, 7, 999):
+        counter = RainflowCounter(edges)
+        for start in range(0, len(x), chunk_size):
+            counter.update(x[start:start + chunk_size])
+        chunked = counter.histogram()
+        np.testing.assert_array_equal(chunked.counts, single.counts)
+        assert chunked.max_peak == single.max_peak
+
+
+def test_rainflow_file_memory_map(tmp_path):
+    rng = np.random.default_rng(3)
+    x = (500 + 100 * rng.normal(size=50000)).astype(np.float32)
+    edges = np.linspace(0, 1000, 21)
+    np.save(tmp_path / 'torque.npy', x)
+    x.tofile(tmp_path / 'torque.f32')
+
+    from_npy = rainflow_file(tmp_path / 'torque.npy', edges, chunk_size=4096)
+    from_raw = rainflow_file(tmp_path / 'torque.f32', edges, chunk_size=1000)
+
+    np.testing.assert_array_equal(from_npy.counts, _reference_histogram(x, edges))
+    np.testing.assert_array_equal(from_raw.counts, from_npy.counts)
+
+    damage = from_npy.damage(materials_COB[0], torque_ref=1000., sig_F_ref=2000., sig_H_ref=2400.)
+    assert damage.per_bin_F.shape == (20,)
+    assert damage.total_F > 0
+
+
+def test_damage_at_peak_of_cycles_with_mean_load():
+    # 500 +- 100 Nm, 1000 cycles of range 200 Nm and peak 600 Nm
+    x = np.tile([500., 600., 500., 400.], 1000)
+    edges = np.linspace(0, 1000, 101)
+    counter = RainflowCounter(edges)
+    counter.update(x)
+    histogram = counter.histogram()
+
+    assert histogram.max_peak == 600. and histogram.counts.sum() == 1000.
+    assert histogram.counts[60] == 1000.
+    curve = materials_COB[0]
+    damage = histogram.damage(curve, torque_ref=1000., sig_F_ref=2000., sig_H_ref=2400.)
+    at_peak = curve.calc_damage_torque([610.], [1000.], 1000., 2000., 2400.)
+    at_range = curve.calc_damage_torque([200.], [1000.], 1000., 2000., 2400.)
+    assert damage.total_F == at_peak.total_F and damage.total_H == at_peak.total_H
+    assert damage.total_F > 1e3 * at_range.total_F
@@ -0,0 +1,17 @@
+import re
+
+from sn_curve_iso_6336 import materials_COB
+from sn_report import render_report
+
+
+def _page_count(path):
+    with open(path, 'rb') as f:
+        return len(re.findall(rb'/Type\s*/Page\b', f.read()))
+
+
+def test_render_report(tmp_path):
+    path = render_report(materials_COB, str(tmp_path / 'report.pdf'))
+
+    assert path == str(tmp_path / 'report.pdf')
+    assert _page_count(path) == len(materials_COB) + 2
+    assert [p.name for p in tmp_path.iterdir()] == ['report.pdf']